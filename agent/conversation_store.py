@@ -0,0 +1,256 @@
+"""
+SQLite-backed conversation history store.
+
+Keeps question history outside the agent process so that context survives
+restarts and is shared by every worker serving the same session.
+Writes are applied by a background thread so they stay off the request path.
+"""
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# One store per database path, shared by every agent in the process
+_stores: Dict[str, "ConversationStore"] = {}
+_stores_lock = threading.Lock()
+
+
+def get_conversation_store(db_path: str, max_entries_per_session: int = 20) -> "ConversationStore":
+    """
+    Get the process-wide conversation store for a database path.
+
+    Each Streamlit session creates its own agent; sharing the store means the
+    schema setup, PRAGMAs and writer thread are paid once per process instead
+    of once per session.
+
+    Args:
+        db_path: Path to the SQLite database file
+        max_entries_per_session: Number of most recent entries kept per session
+
+    Returns:
+        ConversationStore: Shared store instance
+    """
+    key = os.path.abspath(db_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = ConversationStore(db_path, max_entries_per_session=max_entries_per_session)
+            _stores[key] = store
+        return store
+
+
+class ConversationStore:
+    """
+    Persists conversation entries per session in a SQLite database.
+    """
+
+    def __init__(self, db_path: str, max_entries_per_session: int = 20, max_pending_writes: int = 1000):
+        """
+        Initialize the store and create the schema if needed.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            max_entries_per_session (int): Number of most recent entries kept per session
+            max_pending_writes (int): Queued writes before the oldest are dropped
+        """
+        self.db_path = db_path
+        self.max_entries_per_session = max_entries_per_session
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        # One shared connection guarded by a lock (agents may call from worker threads)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        # WAL lets other workers read while the writer thread commits; NORMAL sync is durable under WAL
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("PRAGMA temp_store=MEMORY")
+        self._connection.execute("PRAGMA cache_size=-8192")  # ~8 MiB page cache
+        self._connection.execute("PRAGMA busy_timeout=5000")
+        with self._lock, self._connection:
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    ts REAL NOT NULL,
+                    type TEXT,
+                    original_question TEXT,
+                    processed_question TEXT,
+                    sql TEXT,
+                    context_used INTEGER
+                )
+            """)
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)"
+            )
+
+        # Bounded write queue drained by a single writer thread
+        self._write_queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_pending_writes)
+        # Queued-but-unapplied writes per session, so a reader only waits for its own session
+        self._pending: Dict[str, int] = {}
+        self._pending_changed = threading.Condition()
+        self._writer = threading.Thread(target=self._drain_writes, name="conversation-store-writer", daemon=True)
+        self._writer.start()
+        logger.info(f"Conversation store ready at {db_path}")
+
+    def add(self, session_id: str, entry: Dict[str, Any]) -> None:
+        """
+        Queue an entry for a session; the background writer persists it and
+        trims entries beyond the per-session limit.
+
+        Args:
+            session_id: Conversation session identifier
+            entry: Conversation entry (type, questions, sql, context_used)
+        """
+        self._enqueue((session_id, time.time(), [dict(entry)], False))
+
+    def replace(self, session_id: str, entries: List[Dict[str, Any]]) -> None:
+        """
+        Queue a replacement of a session's entries (e.g. when restoring a saved
+        conversation); the writer applies it as one transaction.
+
+        Args:
+            session_id: Conversation session identifier
+            entries: Entries in chronological order
+        """
+        self._enqueue((session_id, time.time(), [dict(entry) for entry in entries], True))
+
+    def _enqueue(self, item: tuple) -> None:
+        """Put a write on the queue, dropping the oldest pending writes while it is full."""
+        with self._pending_changed:
+            self._pending[item[0]] = self._pending.get(item[0], 0) + 1
+        try:
+            while True:
+                try:
+                    self._write_queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    pass
+                # Drop the oldest pending write rather than blocking the caller; other
+                # sessions may refill the freed slot first, so retry until the put succeeds
+                try:
+                    dropped = self._write_queue.get_nowait()
+                except queue.Empty:
+                    continue
+                self._write_queue.task_done()
+                self._mark_applied(dropped[0])
+                logger.warning("Conversation store write queue full - dropped oldest pending entry")
+        except BaseException:
+            # The write was never queued, so readers of this session must not wait for it
+            self._mark_applied(item[0])
+            raise
+
+    def _mark_applied(self, session_id: str) -> None:
+        """Record that one queued write for a session has been applied (or dropped)."""
+        with self._pending_changed:
+            remaining = self._pending.get(session_id, 0) - 1
+            if remaining > 0:
+                self._pending[session_id] = remaining
+            else:
+                self._pending.pop(session_id, None)
+            self._pending_changed.notify_all()
+
+    def flush(self) -> None:
+        """Block until all queued writes have been applied."""
+        self._write_queue.join()
+
+    def flush_session(self, session_id: str) -> None:
+        """Block until the queued writes for one session have been applied."""
+        with self._pending_changed:
+            self._pending_changed.wait_for(lambda: session_id not in self._pending)
+
+    def _drain_writes(self) -> None:
+        """Writer thread loop: apply queued entries in order."""
+        while True:
+            session_id, ts, entries, replace = self._write_queue.get()
+            try:
+                self._write(session_id, ts, entries, replace)
+            except Exception as e:
+                logger.error(f"Error writing conversation entry for session {session_id}: {e}")
+            finally:
+                self._mark_applied(session_id)
+                self._write_queue.task_done()
+
+    def _write(self, session_id: str, ts: float, entries: List[Dict[str, Any]], replace: bool = False) -> None:
+        """Insert entries (optionally replacing the session's) and trim to the most recent entries."""
+        with self._lock, self._connection:
+            if replace:
+                self._connection.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._connection.executemany(
+                """
+                INSERT INTO messages (session_id, ts, type, original_question, processed_question, sql, context_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        session_id,
+                        ts,
+                        entry.get("type"),
+                        entry.get("original_question"),
+                        entry.get("processed_question"),
+                        entry.get("sql"),
+                        int(bool(entry.get("context_used")))
+                    )
+                    for entry in entries
+                ]
+            )
+            self._connection.execute(
+                """
+                DELETE FROM messages
+                WHERE session_id = ? AND id NOT IN (
+                    SELECT id FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?
+                )
+                """,
+                (session_id, session_id, self.max_entries_per_session)
+            )
+
+    def get_last_question(self, session_id: str) -> Optional[str]:
+        """
+        Get the most recent processed question for a session.
+
+        Returns:
+            str: The last processed question or None
+        """
+        self.flush_session(session_id)
+        with self._lock:
+            row = self._connection.execute(
+                """
+                SELECT processed_question FROM messages
+                WHERE session_id = ? AND type = 'question' AND processed_question IS NOT NULL
+                ORDER BY id DESC LIMIT 1
+                """,
+                (session_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_summary(self, session_id: str) -> Dict[str, Any]:
+        """
+        Get question count and last question time for a session.
+
+        Returns:
+            dict: Summary with total questions and last question timestamp
+        """
+        self.flush_session(session_id)
+        with self._lock:
+            total, last_ts = self._connection.execute(
+                "SELECT COUNT(*), MAX(ts) FROM messages WHERE session_id = ? AND type = 'question'",
+                (session_id,)
+            ).fetchone()
+        return {
+            "total_questions": total,
+            "last_question_time": datetime.fromtimestamp(last_ts) if last_ts is not None else None
+        }
+
+    def clear(self, session_id: str) -> None:
+        """Delete all entries for a session."""
+        self.flush_session(session_id)
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
@@ -0,0 +1,189 @@
+"""
+Custom Vanna class combining ChromaDB vector storage with OpenAI chat.
+
+Kept separate from vanna_agent so the heavy vanna/chromadb/openai stack is only
+imported when a Vanna instance is actually created.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from vanna.openai.openai_chat import OpenAI_Chat
+from vanna.chromadb.chromadb_vector import ChromaDB_VectorStore
+from vanna.utils import deterministic_uuid
+
+from training.prompt_manager import PromptManager
+
+# json.dumps builds a new encoder per call when given options; reuse one instead.
+# Output must stay byte-identical to vanna's add_question_sql documents (and their IDs).
+_SQL_DOCUMENT_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+# One OpenAI client per API key, shared by every MyVanna instance in the process
+_openai_clients: Dict[str, object] = {}
+_openai_clients_lock = threading.Lock()
+
+
+def get_shared_openai_client(api_key: str, max_connections: int = 64):
+    """
+    Get a process-wide OpenAI client for the API key.
+    
+    Each Streamlit session creates its own agent; sharing the client lets all of
+    them reuse one pool of keep-alive connections instead of paying a new TLS
+    handshake per session.
+    
+    Args:
+        api_key: OpenAI API key
+        max_connections: Connection pool size
+        
+    Returns:
+        openai.OpenAI: Shared client instance
+    """
+    with _openai_clients_lock:
+        client = _openai_clients.get(api_key)
+        if client is None:
+            import httpx
+            from openai import DefaultHttpxClient, OpenAI
+            
+            client = OpenAI(
+                api_key=api_key,
+                http_client=DefaultHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=max_connections,
+                        max_keepalive_connections=max(1, max_connections // 2)
+                    )
+                )
+            )
+            _openai_clients[api_key] = client
+        return client
+
+
+class MyVanna(ChromaDB_VectorStore, OpenAI_Chat):
+    """
+    Custom Vanna class combining ChromaDB for vector storage and OpenAI for chat.
+    """
+    def __init__(self, config=None):
+        # Extract ChromaDB specific config
+        chroma_config = {}
+        if config and config.get("persist_directory"):
+            chroma_config["path"] = config["persist_directory"]
+        
+        ChromaDB_VectorStore.__init__(self, config=chroma_config)
+        
+        client = None
+        if config and config.get("api_key"):
+            client = get_shared_openai_client(config["api_key"])
+        OpenAI_Chat.__init__(self, client=client, config=config)
+        
+        # Frozen once so every SQL prompt starts with a byte-identical prefix
+        self._static_prefix = PromptManager.get_static_prompt_prefix()
+        
+        # Digest-keyed LRU for generate_embedding so repeated text is not re-embedded
+        self._embedding_cache: "OrderedDict[bytes, List[float]]" = OrderedDict()
+        self._embedding_cache_lock = threading.Lock()
+        self.max_embedding_cache_size = 4096
+    
+    def generate_embedding(self, data, **kwargs):
+        """
+        Generate an embedding, reusing the cached vector for previously seen text.
+        
+        Only explicit callers go through this cache (in practice the semantic
+        cache lookup): train_batch embeds whole batches with embedding_function,
+        and ChromaDB embeds retrieval queries internally.
+        """
+        if not isinstance(data, str):
+            return super().generate_embedding(data, **kwargs)
+        
+        # In-process key only, so a short BLAKE2b digest is enough and cheaper than SHA-256
+        key = hashlib.blake2b(data.encode("utf-8"), digest_size=16).digest()
+        with self._embedding_cache_lock:
+            embedding = self._embedding_cache.get(key)
+            if embedding is not None:
+                self._embedding_cache.move_to_end(key)
+                return embedding
+        
+        embedding = super().generate_embedding(data, **kwargs)
+        with self._embedding_cache_lock:
+            self._embedding_cache[key] = embedding
+            if len(self._embedding_cache) > self.max_embedding_cache_size:
+                self._embedding_cache.popitem(last=False)
+        return embedding
+    
+    def train_batch(self, question_sql_pairs=None, ddl_list=None, documentation_list=None,
+                    batch_size: int = 50, max_workers: int = 4) -> int:
+        """
+        Bulk-train question/SQL pairs, DDL statements and documentation.
+        
+        Each batch costs one embedding call and one ChromaDB upsert instead of a
+        round-trip per item. Batches are embedded concurrently on a thread pool and
+        then written sequentially. Document and ID formats match vanna's add_*
+        methods, so retrieval behaves exactly as with train().
+        
+        Args:
+            question_sql_pairs: Iterable of (question, sql) tuples
+            ddl_list: Iterable of DDL strings
+            documentation_list: Iterable of documentation strings
+            batch_size: Maximum items per embedding call / upsert
+            max_workers: Maximum concurrent embedding calls
+            
+        Returns:
+            int: Number of items trained
+        """
+        sql_documents = [
+            _SQL_DOCUMENT_ENCODER.encode({"question": question, "sql": sql})
+            for question, sql in (question_sql_pairs or [])
+        ]
+        targets = [
+            (self.sql_collection, sql_documents, "-sql"),
+            (self.ddl_collection, list(ddl_list or []), "-ddl"),
+            (self.documentation_collection, list(documentation_list or []), "-doc"),
+        ]
+        
+        batch_size = max(1, batch_size)
+        jobs = []
+        for collection, documents, id_suffix in targets:
+            # Duplicate IDs within one upsert are rejected by ChromaDB
+            documents = list(dict.fromkeys(documents))
+            for start in range(0, len(documents), batch_size):
+                jobs.append((collection, documents[start:start + batch_size], id_suffix))
+        
+        if not jobs:
+            return 0
+        
+        # Embedding is the slow part; overlap it across batches
+        if len(jobs) == 1:
+            embeddings = [self.embedding_function(jobs[0][1])]
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as executor:
+                embeddings = list(executor.map(lambda job: self.embedding_function(job[1]), jobs))
+        
+        total = 0
+        for (collection, chunk, id_suffix), chunk_embeddings in zip(jobs, embeddings):
+            collection.upsert(
+                ids=[deterministic_uuid(doc) + id_suffix for doc in chunk],
+                documents=chunk,
+                embeddings=chunk_embeddings
+            )
+            total += len(chunk)
+        return total
+    
+    def get_sql_prompt(self, initial_prompt, question, question_sql_list, ddl_list, doc_list, **kwargs):
+        """
+        Build the SQL prompt with static content first and the user question last.
+        
+        OpenAI's automatic prompt caching only applies to an identical prefix, so the
+        frozen system prompt leads and the per-request question stays at the end.
+        Retrieved DDL/docs/examples keep ChromaDB's relevance order: vanna stops
+        adding them at the token budget, so the most relevant must come first.
+        """
+        if initial_prompt is None:
+            initial_prompt = self._static_prefix
+        
+        # The static prompt is also trained as documentation; avoid sending it twice
+        doc_list = [doc for doc in doc_list if doc != self._static_prefix]
+        
+        return super().get_sql_prompt(
+            initial_prompt, question, question_sql_list, ddl_list, doc_list, **kwargs
+        )
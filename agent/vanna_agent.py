@@ -1,37 +1,71 @@
 """
 Refactored Vanna AI integration module for natural language to SQL conversion.
 """
-import pandas as pd
-import traceback
+import asyncio
+import contextlib
+import hashlib
 import logging
 import os
-from datetime import datetime
-from typing import Optional, List, Dict, Any
-from vanna.openai.openai_chat import OpenAI_Chat
-from vanna.chromadb.chromadb_vector import ChromaDB_VectorStore
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Tuple
 
-from config.settings import VANNA_CONFIG
-from database.connector import PostgreSQLConnector
+from config.settings import POSTGRES_MAX_RESULT_ROWS, VANNA_CONFIG
+from agent.conversation_store import ConversationStore, get_conversation_store
+from database.connector import PostgreSQLConnector, QueryResult
 from training.training_loader import TrainingDataLoader
 from database.schema_manager import SchemaManager
 from validation.sql_validator import SQLValidator
 from training.prompt_manager import PromptManager
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 logger = logging.getLogger(__name__)
 
+# Sample queries demonstrating conversion rate / price test calculations (single-pass scan)
+_CRITICAL_QUERY_PATTERN = re.compile(r"轉換率|conversion|價格測試|price-test", re.IGNORECASE)
+
+# Follow-up markers (pronouns / back-references) that make a question depend on earlier context
+_NEEDS_CONTEXT_PATTERN = re.compile(
+    r"\b(?:it|they|them|those|last|previous|same|again)\b|剛剛|剛才|上一個|那個|它|他們",
+    re.IGNORECASE
+)
+
+# Literals that change a question's meaning without changing its embedding much:
+# quoted strings, dates/times and numbers (e.g. "experiment 12" vs "experiment 13")
+_QUESTION_LITERAL_PATTERN = re.compile(r"'[^']*'|\"[^\"]*\"|「[^」]*」|“[^”]*”|\d+(?:[-/.:]\d+)*")
 
-class MyVanna(ChromaDB_VectorStore, OpenAI_Chat):
+# vanna and its dependencies are chatty during training
+_TRAINING_NOISY_LOGGERS = ('vanna', 'chromadb', 'openai', 'httpx', 'httpcore', '__main__')
+
+
+@contextlib.contextmanager
+def _suppress_training_output(silence_stdout: bool = True):
     """
-    Custom Vanna class combining ChromaDB for vector storage and OpenAI for chat.
+    Temporarily silence vanna-related loggers and, optionally, stdout prints.
+    
+    Args:
+        silence_stdout: Also discard print() output. stdout is process-global, so
+            pass False when running on a background thread.
     """
-    def __init__(self, config=None):
-        # Extract ChromaDB specific config
-        chroma_config = {}
-        if config and config.get("persist_directory"):
-            chroma_config["path"] = config["persist_directory"]
-        
-        ChromaDB_VectorStore.__init__(self, config=chroma_config)
-        OpenAI_Chat.__init__(self, config=config)
+    original_levels = {name: logging.getLogger(name).level for name in _TRAINING_NOISY_LOGGERS}
+    for name in _TRAINING_NOISY_LOGGERS:
+        logging.getLogger(name).setLevel(logging.CRITICAL)  # Suppress almost everything
+    try:
+        if silence_stdout:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                yield
+        else:
+            yield
+    finally:
+        for name, level in original_levels.items():
+            logging.getLogger(name).setLevel(level)
 
 
 class VannaAgent:
@@ -47,9 +81,15 @@ class VannaAgent:
     Features:
     - Conversational context: Uses vanna.ai's generate_rewritten_question for dialog
     - Session management: Maintains conversation history for context
+    - Query caching: Exact-match LRU plus a ChromaDB semantic cache for repeated questions
     """
     
-    def __init__(self, config=None, db_connector=None, training_data_path=None):
+    SEMANTIC_CACHE_COLLECTION = "sql_cache"
+    ARROW_RESULT_THRESHOLD = 1000  # Rows above which execute() returns a pyarrow Table
+    RESULT_FETCH_CHUNK_SIZE = 5000  # Rows per server-side cursor fetch for generated SQL
+    MAX_RESULT_ROWS = POSTGRES_MAX_RESULT_ROWS  # Rows read back before generated SQL results are truncated
+    
+    def __init__(self, config=None, db_connector=None, training_data_path=None, session_id=None):
         """
         Initialize the Vanna AI agent.
         
@@ -57,12 +97,17 @@ class VannaAgent:
             config (dict, optional): Vanna configuration
             db_connector (PostgreSQLConnector, optional): Database connector
             training_data_path (str, optional): Path to training data directory
+            session_id (str, optional): Default conversation session identifier
         """
         self.config = config or VANNA_CONFIG
         self.db_connector = db_connector or PostgreSQLConnector()
         
         # Initialize specialized components
-        self.schema_manager = SchemaManager(self.db_connector)
+        self.schema_manager = SchemaManager(
+            self.db_connector,
+            cache_dir=self.config.get("cache_dir"),
+            cache_ttl=self.config.get("schema_cache_ttl")
+        )
         self.sql_validator = SQLValidator(self.schema_manager)
         self.training_loader = TrainingDataLoader(training_data_path)
         
@@ -71,76 +116,299 @@ class VannaAgent:
         self.initialized = False
         
         # Conversation management
-        self.conversation_history: List[Dict[str, Any]] = []
         self.max_history_length = 20  # Limit history to prevent memory issues
+        # Bounded deque drops the oldest entry on append once full
+        self.conversation_history: "deque[Dict[str, Any]]" = deque(maxlen=self.max_history_length)
+        # Entries store raw monotonic ns; wall-clock time is derived from this anchor on demand
+        self._epoch = datetime.now()
+        self._epoch_monotonic_ns = time.monotonic_ns()
+        
+        # Optional persistent history shared across workers and restarts
+        self.session_id = session_id or uuid.uuid4().hex
+        self.conversation_store = self._create_conversation_store()
+        
+        # Exact-match SQL cache (LRU), invalidated whenever training data changes
+        self._sql_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._sql_cache_lock = threading.Lock()
+        self.max_sql_cache_size = 1024
+        self._schema_version = 0
+        
+        # Semantic cache collection for near-duplicate questions (created with the Vanna instance).
+        # Entries are tagged with their creation time; only entries newer than this
+        # agent's last invalidation are served
+        self._semantic_cache = None
+        self._semantic_cache_generation = 0.0
         
         # Validate API key
         if not self.config.get("api_key"):
             logger.warning("No OpenAI API key provided. Please set VANNA_API_KEY in .env file.")
 
-    def clear_conversation(self) -> None:
+    def _create_conversation_store(self) -> Optional[ConversationStore]:
+        """Create the persistent conversation store if a database path is configured."""
+        db_path = self.config.get("conversation_db_path")
+        if not db_path:
+            return None
+        try:
+            return get_conversation_store(db_path, max_entries_per_session=self.max_history_length)
+        except Exception as e:
+            logger.warning(f"Conversation store unavailable, using in-memory history: {e}")
+            return None
+
+    def clear_conversation(self, session_id: Optional[str] = None) -> None:
         """
         Clear the conversation history.
+        
+        Args:
+            session_id: Session to clear (defaults to the agent's session)
         """
         self.conversation_history.clear()
+        if self.conversation_store:
+            self.conversation_store.clear(session_id or self.session_id)
         logger.info("Conversation history cleared")
 
-    def get_conversation_summary(self) -> Dict[str, Any]:
+    def set_conversation_history(self, entries: List[Dict[str, Any]], session_id: Optional[str] = None) -> None:
+        """
+        Replace the conversation history in one step (e.g. when restoring a saved conversation).
+        
+        Only the most recent max_history_length entries are kept, and the store
+        applies the replacement as a single queued write. The entries are copied
+        and stamped with increasing timestamps in the given order, ending at the
+        current time; the caller's dicts are not modified.
+        
+        Args:
+            entries: Conversation entries in chronological order
+            session_id: Session the entries belong to (defaults to the agent's session)
+        """
+        entries = entries[-self.max_history_length:]
+        start_ns = time.monotonic_ns() - len(entries)
+        entries = [{**entry, "timestamp_ns": start_ns + i} for i, entry in enumerate(entries, 1)]
+        self.conversation_history = deque(entries, maxlen=self.max_history_length)
+        if self.conversation_store:
+            try:
+                self.conversation_store.replace(session_id or self.session_id, entries)
+            except Exception as e:
+                logger.warning(f"Error persisting conversation history: {e}")
+
+    def get_conversation_summary(self, session_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Get a summary of the current conversation.
         
+        Args:
+            session_id: Session to summarize (defaults to the agent's session)
+        
         Returns:
             dict: Summary with total questions and last question timestamp
         """
+        if self.conversation_store:
+            return self.conversation_store.get_summary(session_id or self.session_id)
+        
         if not self.conversation_history:
             return {"total_questions": 0, "last_question_time": None}
         
-        questions = [item for item in self.conversation_history if item.get("type") == "question"]
+        total_questions = 0
+        last_question_time = None
+        for item in self.conversation_history:
+            if item.get("type") == "question":
+                total_questions += 1
+                last_question_time = item.get("timestamp_ns")
         return {
-            "total_questions": len(questions),
-            "last_question_time": questions[-1].get("timestamp") if questions else None
+            "total_questions": total_questions,
+            "last_question_time": self._to_datetime(last_question_time) if last_question_time is not None else None
         }
 
-    def _get_last_question(self) -> Optional[str]:
+    def _to_datetime(self, monotonic_ns: int) -> datetime:
+        """Convert a history monotonic timestamp (ns) to wall-clock datetime."""
+        return self._epoch + timedelta(microseconds=(monotonic_ns - self._epoch_monotonic_ns) / 1000)
+
+    def _get_last_question(self, session_id: Optional[str] = None) -> Optional[str]:
         """
         Get the last question from conversation history.
         
+        Args:
+            session_id: Session to look up (defaults to the agent's session)
+        
         Returns:
             str: The last question or None if no previous questions
         """
+        if self.conversation_store:
+            return self.conversation_store.get_last_question(session_id or self.session_id)
+        
         # Search backwards through history for the most recent question
         for item in reversed(self.conversation_history):
             if item.get("type") == "question" and item.get("processed_question"):
                 return item["processed_question"]
         return None
 
-    def _add_to_conversation_history(self, entry: Dict[str, Any]) -> None:
+    def _add_to_conversation_history(self, entry: Dict[str, Any], session_id: Optional[str] = None) -> None:
         """
         Add an entry to conversation history with automatic cleanup.
         
+        The history deque is bounded by max_history_length, so the oldest
+        entry is discarded automatically once the limit is reached. When a
+        conversation store is configured the entry is also persisted.
+        
         Args:
             entry: Dictionary containing conversation entry data
+            session_id: Session the entry belongs to (defaults to the agent's session)
         """
-        entry["timestamp"] = datetime.now()
+        entry["timestamp_ns"] = time.monotonic_ns()
         self.conversation_history.append(entry)
+        if self.conversation_store:
+            try:
+                self.conversation_store.add(session_id or self.session_id, entry)
+            except Exception as e:
+                logger.warning(f"Error persisting conversation entry: {e}")
+
+    def _sql_cache_key(self, question: str) -> str:
+        """
+        Build the cache key for a processed question.
         
-        # Cleanup old entries if history gets too long
-        if len(self.conversation_history) > self.max_history_length:
-            # Keep the most recent entries
-            self.conversation_history = self.conversation_history[-self.max_history_length:]
-            logger.debug("Conversation history cleaned up")
+        Args:
+            question: The processed (possibly rewritten) question
+            
+        Returns:
+            str: SHA-256 hex digest of model, schema version and question
+        """
+        # Whitespace variants share a key; case is kept since literals in questions can be case-sensitive
+        normalized = " ".join(question.split())
+        raw = f"{self.config.get('model')}|{self._schema_version}|{normalized}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _get_cached_sql(self, cache_key: str) -> Optional[str]:
+        """Return cached SQL for the key, marking it as most recently used."""
+        with self._sql_cache_lock:
+            sql = self._sql_cache.get(cache_key)
+            if sql is not None:
+                self._sql_cache.move_to_end(cache_key)
+            return sql
 
-    def _rewrite_question_with_context(self, question: str) -> str:
+    def _store_cached_sql(self, cache_key: str, sql: str) -> None:
+        """Store validated SQL in the cache, evicting the least recently used entry."""
+        with self._sql_cache_lock:
+            self._sql_cache[cache_key] = sql
+            self._sql_cache.move_to_end(cache_key)
+            if len(self._sql_cache) > self.max_sql_cache_size:
+                self._sql_cache.popitem(last=False)
+
+    def _invalidate_sql_cache(self) -> None:
+        """Invalidate cached SQL after training data changes."""
+        with self._sql_cache_lock:
+            self._schema_version += 1
+            self._sql_cache.clear()
+        self._reset_semantic_cache()
+        logger.debug("SQL cache invalidated")
+
+    def _create_semantic_cache(self) -> None:
+        """Create (or open) the ChromaDB collection backing the semantic cache."""
+        if not self.config.get("semantic_cache_enabled", False):
+            return
+        try:
+            # Cosine space so that similarity = 1 - distance
+            self._semantic_cache = self.vanna_instance.chroma_client.get_or_create_collection(
+                name=self.SEMANTIC_CACHE_COLLECTION,
+                metadata={"hnsw:space": "cosine"}
+            )
+        except Exception as e:
+            logger.warning(f"Semantic cache disabled, could not create collection: {e}")
+            self._semantic_cache = None
+
+    def _reset_semantic_cache(self) -> None:
+        """
+        Invalidate semantic cache entries so stale SQL is never served after retraining.
+        
+        The collection is persisted and shared by every agent, so it is never
+        dropped (other sessions hold handles to it); entries created before now
+        are filtered out of this agent's lookups and deleted.
+        """
+        self._semantic_cache_generation = time.time()
+        if self._semantic_cache is None:
+            return
+        try:
+            self._semantic_cache.delete(where={"generation": {"$lt": self._semantic_cache_generation}})
+        except Exception as e:
+            logger.debug(f"Error deleting stale semantic cache entries: {e}")
+
+    @staticmethod
+    def _question_literals(question: str) -> str:
+        """Canonical form of the literals in a question, used to guard semantic cache hits."""
+        return "\x1f".join(sorted(set(_QUESTION_LITERAL_PATTERN.findall(question))))
+
+    def _semantic_cache_lookup(self, question: str) -> Tuple[Optional[str], Optional[List[float]]]:
+        """
+        Look up SQL for a semantically similar question.
+        
+        Args:
+            question: The processed question
+            
+        Returns:
+            tuple: (cached SQL or None, question embedding for a later store)
+        """
+        if self._semantic_cache is None:
+            return None, None
+        try:
+            embedding = self.vanna_instance.generate_embedding(question)
+            if self._semantic_cache.count() == 0:
+                return None, embedding
+            
+            # Only current entries for questions with exactly the same literals may share SQL
+            result = self._semantic_cache.query(
+                query_embeddings=[embedding],
+                n_results=1,
+                where={"$and": [
+                    {"generation": {"$gte": self._semantic_cache_generation}},
+                    {"literals": self._question_literals(question)}
+                ]}
+            )
+            distances = result.get("distances") or [[]]
+            metadatas = result.get("metadatas") or [[]]
+            if distances[0] and metadatas[0]:
+                similarity = 1 - distances[0][0]
+                if similarity >= self.config.get("semantic_cache_threshold", 0.92):
+                    logger.info(f"Semantic cache hit (similarity={similarity:.3f})")
+                    return metadatas[0][0].get("sql"), embedding
+            return None, embedding
+        except Exception as e:
+            logger.warning(f"Error querying semantic cache: {e}")
+            # Re-acquire the collection in case it was recreated by another process
+            self._create_semantic_cache()
+            return None, None
+
+    def _semantic_cache_store(self, cache_key: str, question: str, embedding: Optional[List[float]], sql: str) -> None:
+        """Store validated SQL in the semantic cache."""
+        if self._semantic_cache is None or embedding is None:
+            return
+        try:
+            self._semantic_cache.upsert(
+                ids=[cache_key],
+                embeddings=[embedding],
+                documents=[question],
+                metadatas=[{
+                    "sql": sql,
+                    "literals": self._question_literals(question),
+                    "generation": time.time()
+                }]
+            )
+        except Exception as e:
+            logger.warning(f"Error storing semantic cache entry: {e}")
+            self._create_semantic_cache()
+
+    def _rewrite_question_with_context(self, question: str, session_id: Optional[str] = None) -> str:
         """
         Rewrite question using conversation context via vanna's generate_rewritten_question.
         
         Args:
             question: The new question to potentially rewrite
+            session_id: Session whose history provides the context
             
         Returns:
             str: The rewritten question or original if no context/rewriting needed
         """
-        last_question = self._get_last_question()
+        # Self-contained questions don't need an extra LLM round-trip
+        if not _NEEDS_CONTEXT_PATTERN.search(question):
+            logger.info("Question is self-contained, skipping context rewrite (skipped_rewrite=True)")
+            return question
+        
+        last_question = self._get_last_question(session_id)
         if not last_question:
             return question
             
@@ -190,16 +458,17 @@ class VannaAgent:
             
         except Exception as e:
             logger.error(f"Error initializing Vanna AI agent: {e}")
-            logger.debug(traceback.format_exc())
+            logger.debug("Traceback:", exc_info=True)
             return False
     
-    def ask(self, question: str, use_conversation_context: bool = False) -> dict:
+    def ask(self, question: str, use_conversation_context: bool = False, session_id: Optional[str] = None) -> dict:
         """
         Process a natural language question and generate SQL.
         
         Args:
             question: Natural language question about the data
             use_conversation_context: Whether to use conversation context for question rewriting
+            session_id: Conversation session (defaults to the agent's session)
             
         Returns:
             dict: Dictionary with generated SQL or error information
@@ -217,23 +486,40 @@ class VannaAgent:
             # Apply conversation context if requested
             processed_question = question
             if use_conversation_context:
-                processed_question = self._rewrite_question_with_context(question)
+                processed_question = self._rewrite_question_with_context(question, session_id)
+            
+            # Reuse SQL for an identical question without another LLM round-trip
+            cache_key = self._sql_cache_key(processed_question)
+            generated_sql = self._get_cached_sql(cache_key)
+            question_embedding = None
+            if generated_sql:
+                logger.info("SQL cache hit for processed question")
+            else:
+                # Fall back to the semantic cache for differently phrased questions
+                generated_sql, question_embedding = self._semantic_cache_lookup(processed_question)
+                if generated_sql:
+                    self._store_cached_sql(cache_key, generated_sql)
             
-            # Generate SQL using the processed question
-            generated_sql = self.vanna_instance.generate_sql(processed_question)
             if not generated_sql:
-                return {"error": "Failed to generate SQL", "question": question}
-            
-            # Validate SQL
-            is_valid, validation_error = self.sql_validator.validate_sql(generated_sql, processed_question)
-            if not is_valid:
-                logger.warning(f"Generated invalid SQL: {validation_error}")
-                return {
-                    "error": f"生成的SQL無效: {validation_error}. 請重新描述您的問題或檢查欄位名稱。",
-                    "question": question,
-                    "processed_question": processed_question,
-                    "sql": generated_sql
-                }
+                # Generate SQL using the processed question
+                generated_sql = self.vanna_instance.generate_sql(processed_question)
+                if not generated_sql:
+                    return {"error": "Failed to generate SQL", "question": question}
+                
+                # Validate SQL
+                is_valid, validation_error = self.sql_validator.validate_sql(generated_sql, processed_question)
+                if not is_valid:
+                    logger.warning(f"Generated invalid SQL: {validation_error}")
+                    return {
+                        "error": f"生成的SQL無效: {validation_error}. 請重新描述您的問題或檢查欄位名稱。",
+                        "question": question,
+                        "processed_question": processed_question,
+                        "sql": generated_sql
+                    }
+                
+                # Only validated SQL is cached so a retry can still produce a better query
+                self._store_cached_sql(cache_key, generated_sql)
+                self._semantic_cache_store(cache_key, processed_question, question_embedding, generated_sql)
             
             # Add to conversation history
             self._add_to_conversation_history({
@@ -242,7 +528,7 @@ class VannaAgent:
                 "processed_question": processed_question,
                 "sql": generated_sql,
                 "context_used": use_conversation_context
-            })
+            }, session_id)
             
             result = {
                 "question": question,
@@ -258,22 +544,23 @@ class VannaAgent:
             
         except Exception as e:
             logger.error(f"Error processing question: {e}")
-            logger.debug(traceback.format_exc())
+            logger.debug("Traceback:", exc_info=True)
             return {"error": str(e), "question": question}
     
-    def execute(self, question: str, use_conversation_context: bool = False) -> dict:
+    def execute(self, question: str, use_conversation_context: bool = False, session_id: Optional[str] = None) -> dict:
         """
         Process a question, generate SQL, and execute it against the database.
         
         Args:
             question: Natural language question about the data
             use_conversation_context: Whether to use conversation context for question rewriting
+            session_id: Conversation session (defaults to the agent's session)
             
         Returns:
             dict: Dictionary with question, SQL, and results
         """
         # Generate SQL from question
-        result = self.ask(question, use_conversation_context=use_conversation_context)
+        result = self.ask(question, use_conversation_context=use_conversation_context, session_id=session_id)
         
         if "error" in result:
             return result
@@ -289,20 +576,88 @@ class VannaAgent:
                 }
             
             logger.info(f"Executing SQL: {sql}")
-            df = self.db_connector.execute_query(sql)
+            df = self.db_connector.execute_query(
+                sql, chunksize=self.RESULT_FETCH_CHUNK_SIZE, max_rows=self.MAX_RESULT_ROWS
+            )
             
-            result["results"] = df.to_dict('records') if df is not None and not df.empty else []
+            result.update(self._serialize_results(df))
+            result["truncated"] = bool(df is not None and getattr(df, "attrs", {}).get("truncated"))
             result["success"] = df is not None
             
             return result
             
         except Exception as e:
             logger.error(f"Error executing query: {e}")
-            logger.debug(traceback.format_exc())
+            logger.debug("Traceback:", exc_info=True)
             result["error"] = str(e)
             result["success"] = False
             return result
     
+    def _serialize_results(self, df: "pd.DataFrame | QueryResult | None") -> dict:
+        """
+        Serialize query results for the execute() response.
+        
+        Small frames are returned as a list of row dicts. Large frames are returned
+        as a columnar pyarrow Table, avoiding one Python dict per row.
+        
+        Args:
+            df: Query result DataFrame, QueryResult for statements without rows,
+                or None on failure
+            
+        Returns:
+            dict: "format" ("dict" or "arrow"), "row_count" and either "results"
+                  (list of dicts) or "results_arrow" (pyarrow.Table)
+        """
+        if isinstance(df, QueryResult):
+            return {"format": "dict", "row_count": 0, "results": [], "rows_affected": df.rows_affected}
+        
+        if df is None or df.empty:
+            return {"format": "dict", "row_count": 0, "results": []}
+        
+        if len(df) > self.ARROW_RESULT_THRESHOLD:
+            try:
+                import pyarrow as pa
+                
+                return {
+                    "format": "arrow",
+                    "row_count": len(df),
+                    "results_arrow": pa.Table.from_pandas(df, preserve_index=False)
+                }
+            except Exception as e:
+                # Mixed-type JSONB columns may not convert; fall back to row dicts
+                logger.warning(f"Arrow serialization failed, returning row dicts: {e}")
+        
+        return {"format": "dict", "row_count": len(df), "results": df.to_dict('records')}
+    
+    async def ask_many(self, questions: List[str], max_concurrency: Optional[int] = None) -> List[dict]:
+        """
+        Process several independent questions concurrently.
+        
+        Vanna is synchronous, so each question runs in a worker thread and the
+        OpenAI round-trips overlap instead of running one after another. A
+        semaphore caps the number of in-flight requests to stay within rate limits.
+        
+        Args:
+            questions: Natural language questions to process
+            max_concurrency: Maximum concurrent questions (defaults to config "max_concurrency")
+            
+        Returns:
+            list: One result dict per question, in the same order as the input
+        """
+        if not self.initialized:
+            if not await asyncio.to_thread(self.initialize):
+                return [{"error": "Vanna AI agent not initialized", "question": q} for q in questions]
+        
+        limit = max_concurrency or self.config.get("max_concurrency", 8)
+        semaphore = asyncio.Semaphore(max(1, limit))
+        
+        async def _ask_one(question: str) -> dict:
+            async with semaphore:
+                # Questions are independent, so conversation context is not applied
+                return await asyncio.to_thread(self.ask, question)
+        
+        return list(await asyncio.gather(*(_ask_one(q) for q in questions)))
+    
     def train_with_examples(self, examples=None, reload_training_data=False) -> bool:
         """
         Train Vanna with example question-SQL pairs.
@@ -322,6 +677,7 @@ class VannaAgent:
         try:
             if reload_training_data or examples is None:
                 self._load_training_data()
+                self._invalidate_sql_cache()
                 if examples is None:
                     return True
             
@@ -331,14 +687,30 @@ class VannaAgent:
                     self.vanna_instance.train(question=example['question'], sql=example['sql'])
                     logger.debug(f"Trained with example: {example['question'][:50]}...")
             
+            self._invalidate_sql_cache()
             logger.info(f"Successfully trained with {len(examples)} examples")
             return True
             
         except Exception as e:
             logger.error(f"Error training with examples: {e}")
-            logger.debug(traceback.format_exc())
+            logger.debug("Traceback:", exc_info=True)
             return False
     
+    async def reload_training_data_async(self) -> bool:
+        """
+        Reload training data from files without blocking the event loop.
+        
+        Returns:
+            bool: True if the agent is initialized and loading was attempted
+        """
+        if not self.initialized:
+            if not await asyncio.to_thread(self.initialize):
+                logger.error("Cannot train: Vanna AI agent not initialized")
+                return False
+        
+        await self._load_training_data_async()
+        return True
+    
     def _validate_config(self) -> bool:
         """Validate Vanna configuration."""
         if not self.config.get("api_key"):
@@ -349,14 +721,18 @@ class VannaAgent:
     def _create_vanna_instance(self) -> bool:
         """Create and configure Vanna instance."""
         try:
+            # Imported lazily: pulls in vanna, chromadb and the OpenAI SDK
+            from agent.custom_vanna import MyVanna
+            
             self.vanna_instance = MyVanna(config=self.config)
+            self._create_semantic_cache()
             
             logger.info("Vanna instance created successfully")
             return True
             
         except Exception as e:
             logger.error(f"Error creating Vanna instance: {e}")
-            logger.debug(traceback.format_exc())
+            logger.debug("Traceback:", exc_info=True)
             return False
     
     def _connect_database(self) -> bool:
@@ -366,23 +742,44 @@ class VannaAgent:
                 logger.error("Failed to connect to database")
                 return False
             
-            # Connect Vanna to database
-            self.vanna_instance.connect_to_postgres(
-                host=self.db_connector.config_kwargs.get('host'),
-                dbname=self.db_connector.config_kwargs.get('database') or self.db_connector.config_kwargs.get('dbname'),
-                user=self.db_connector.config_kwargs.get('user'),
-                password=self.db_connector.config_kwargs.get('password'),
-                port=self.db_connector.config_kwargs.get('port')
-            )
+            # Route Vanna's SQL through the pooled connector. connect_to_postgres would open
+            # an extra probe connection here and a fresh connection for every run_sql call;
+            # the pool warm-up above already verified the database is reachable.
+            self.vanna_instance.dialect = "PostgreSQL"
+            self.vanna_instance.run_sql = self._run_sql_for_vanna
+            self.vanna_instance.run_sql_is_set = True
             
             logger.info("Database connection established")
             return True
             
         except Exception as e:
             logger.error(f"Error connecting to database: {e}")
-            logger.debug(traceback.format_exc())
+            logger.debug("Traceback:", exc_info=True)
             return False
     
+    def _run_sql_for_vanna(self, sql: str, **kwargs) -> "pd.DataFrame":
+        """
+        run_sql implementation handed to Vanna.
+        
+        Vanna expects run_sql to raise on failure and to always return a DataFrame
+        (e.g. it calls df.to_markdown() on intermediate SQL results), while the
+        connector returns None on error and QueryResult for statements without rows.
+        """
+        result = self.db_connector.execute_query(sql)
+        if result is None:
+            raise RuntimeError(f"Error executing SQL: {sql}")
+        if isinstance(result, QueryResult):
+            import pandas as pd
+            
+            return pd.DataFrame()
+        return result
+    
+    # Core tables embedded at startup (event tables are reached through the metrics table)
+    CORE_TABLES = [
+        'experiments', 'experiment_groups', 'experiment_daily_metrics',  # 核心實驗表格
+        'shops'  # 商店資訊
+    ]
+    
     def _train_system(self):
         """Train the system with essential prompts and schema only."""
         try:
@@ -390,20 +787,34 @@ class VannaAgent:
             if not self._should_retrain():
                 logger.info("Skipping training - embeddings already exist and force_retrain=False")
                 return
-                
-            # Train with essential prompts and schema
-            self._train_with_essential_prompts()
-            self._train_with_expanded_schema()
             
             # Only load training data if configured to do so
-            if self.config.get("load_training_on_startup", True):
-                self._load_critical_training_data()
+            load_queries = self.config.get("load_training_on_startup", True)
+            background = load_queries and self.config.get("background_training", False)
+            
+            # Prompts, schema and (unless deferred) sample queries in one fused pass
+            self._train_all(include_critical_queries=load_queries and not background)
+            
+            if background:
+                # Embed sample queries off the startup path; initialize() returns immediately
+                threading.Thread(
+                    target=self._load_critical_training_data_in_background,
+                    name="vanna-training-loader",
+                    daemon=True
+                ).start()
             
+            self._invalidate_sql_cache()
             logger.info("Essential system training completed")
             
         except Exception as e:
             logger.error(f"Error during system training: {e}")
-            logger.debug(traceback.format_exc())
+            logger.debug("Traceback:", exc_info=True)
+    
+    def _load_critical_training_data_in_background(self):
+        """Load critical training data on a worker thread, then drop stale cached SQL."""
+        logger.info("Loading critical training data in background")
+        self._load_critical_training_data()
+        self._invalidate_sql_cache()
     
     def _should_retrain(self) -> bool:
         """Check if we should retrain based on configuration and existing embeddings."""
@@ -421,188 +832,183 @@ class VannaAgent:
         logger.info(f"No existing embeddings found in {persist_dir} - will train")
         return True
     
-    def _train_with_essential_prompts(self):
-        """Train with only essential prompts to avoid token overflow."""
+    def _train_all(self, include_critical_queries: bool = True):
+        """
+        Train essential prompts, core schema DDL and critical sample queries in one pass.
+        
+        Inputs for each section are collected independently (a failing section is
+        logged and skipped), then everything is embedded and written with a single
+        train_batch call instead of one round-trip per section. Schema DDL (database)
+        and sample queries (disk) are prepared concurrently.
+        """
+        prompt_manager = PromptManager()
+        documentation = []
+        table_ddls = {}
+        critical_queries = []
+        total_queries = 0
+        
         try:
-            prompt_manager = PromptManager()
-            
-            # Train with all essential prompts for better guidance
-            essential_prompt = prompt_manager.get_system_prompt()
-            schema_enforcement = prompt_manager.get_schema_enforcement_prompt()
-            
-            # Combine prompts for comprehensive guidance
-            combined_prompt = f"{essential_prompt}\n\n{schema_enforcement}"
-            
-            # 🔇 Comprehensive logging suppression for vanna and all dependencies
-            import sys
-            from io import StringIO
-            
-            # Store original stdout and loggers
-            original_stdout = sys.stdout
-            original_loggers = {}
-            
-            # List of all possible vanna-related loggers to suppress
-            logger_names = ['vanna', 'chromadb', 'openai', 'httpx', 'httpcore', '__main__']
-            
-            for logger_name in logger_names:
-                target_logger = logging.getLogger(logger_name)
-                original_loggers[logger_name] = target_logger.level
-                target_logger.setLevel(logging.CRITICAL)  # Suppress almost everything
-            
-            # Redirect stdout to catch print statements
-            captured_output = StringIO()
-            sys.stdout = captured_output
-            
-            self.vanna_instance.train(documentation=combined_prompt)
-            
-            # 🔊 Restore original stdout and log levels
-            sys.stdout = original_stdout
-            for logger_name, original_level in original_loggers.items():
-                logging.getLogger(logger_name).setLevel(original_level)
-            
+            # Combined prompt matches MyVanna's static prefix so it can be de-duplicated
+            documentation.append(prompt_manager.get_static_prompt_prefix())
+        except Exception as e:
+            logger.error(f"Error preparing essential prompts: {e}")
+            logger.debug("Traceback:", exc_info=True)
+        
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="train-prep") as executor:
+            # Enhanced DDL with comments (reused from the schema cache when unchanged)
+            ddl_future = executor.submit(self.schema_manager.get_table_ddls, self.CORE_TABLES)
+            queries_future = executor.submit(self._get_critical_queries) if include_critical_queries else None
+            
+            try:
+                table_ddls = ddl_future.result()
+            except Exception as e:
+                logger.error(f"Error preparing expanded schema: {e}")
+                logger.debug("Traceback:", exc_info=True)
+            
+            if queries_future is not None:
+                try:
+                    critical_queries, total_queries = queries_future.result()
+                except Exception as e:
+                    logger.error(f"Error preparing critical training data: {e}")
+                    logger.debug("Traceback:", exc_info=True)
+        
+        try:
+            # 🔇 Silence vanna and dependency output while training
+            with _suppress_training_output():
+                self.vanna_instance.train_batch(
+                    question_sql_pairs=[(query['question'], query['sql']) for query in critical_queries[:10]],  # Only top 10 critical queries
+                    ddl_list=list(table_ddls.values()),
+                    documentation_list=documentation,
+                    batch_size=self.config.get("training_batch_size", 50)
+                )
+        except Exception as e:
+            logger.error(f"Error during fused training: {e}")
+            logger.debug("Traceback:", exc_info=True)
+            return
+        
+        if documentation:
             # 🎨 Beautiful system prompt display without timestamp clutter
             print("\n" + "📋 System Prompt Successfully Loaded:".center(80))
             print("=" * 80)
-            for line in essential_prompt.split('\n'):
+            for line in prompt_manager.get_system_prompt().split('\n'):
                 if line.strip():
                     print(f"   {line}")
             print("=" * 80)
             logger.info("✅ Essential prompt training completed")
-            
-        except Exception as e:
-            logger.error(f"Error training with essential prompts: {e}")
-            logger.debug(traceback.format_exc())
+        
+        # 📊 Concise DDL logging - only show which tables were loaded
+        schema_info = self.schema_manager.get_schema_info()
+        logger.info("📊 Database Schema Successfully Loaded:")
+        logger.info("   Tables embedded:")
+        for table in table_ddls:
+            column_count = len(schema_info[table])
+            logger.info(f"     ✅ {table} ({column_count} columns)")
+        logger.info(f"✅ Schema training completed for {len(table_ddls)} core tables")
+        
+        if include_critical_queries:
+            self._log_critical_training_summary(len(critical_queries), total_queries)
     
-    def _train_with_expanded_schema(self):
-        """Train with expanded core database schema including event tables."""
-        try:
-            schema_info = self.schema_manager.get_schema_info()
-            
-            # Expand core tables to include event tables for conversion calculations
-            core_tables = [
-                'experiments', 'experiment_groups', 'experiment_daily_metrics',  # 核心實驗表格
-                'shops'  # 商店資訊
-            ]
-            
-            # 🔇 Comprehensive logging suppression for vanna and all dependencies
-            import sys
-            from io import StringIO
-            
-            # Store original stdout and loggers
-            original_stdout = sys.stdout
-            original_loggers = {}
-            
-            # List of all possible vanna-related loggers to suppress
-            logger_names = ['vanna', 'chromadb', 'openai', 'httpx', 'httpcore', '__main__']
-            
-            for logger_name in logger_names:
-                target_logger = logging.getLogger(logger_name)
-                original_loggers[logger_name] = target_logger.level
-                target_logger.setLevel(logging.CRITICAL)  # Suppress almost everything
-            
-            # Redirect stdout to catch print statements
-            captured_output = StringIO()
-            sys.stdout = captured_output
-            
-            loaded_tables = []
-            for table_name, columns in schema_info.items():
-                if table_name in core_tables:
-                    # Generate enhanced DDL with comments (but don't log the full DDL)
-                    ddl = self.schema_manager.generate_enhanced_ddl(table_name, columns)
-                    self.vanna_instance.train(ddl=ddl)
-                    loaded_tables.append(table_name)
-            
-            # 🔊 Restore original stdout and log levels
-            sys.stdout = original_stdout
-            for logger_name, original_level in original_loggers.items():
-                logging.getLogger(logger_name).setLevel(original_level)
-            
-            # 📊 Concise DDL logging - only show which tables were loaded
-            logger.info("📊 Database Schema Successfully Loaded:")
-            logger.info("   Tables embedded:")
-            for table in loaded_tables:
-                column_count = len(schema_info[table])
-                logger.info(f"     ✅ {table} ({column_count} columns)")
-            logger.info(f"✅ Schema training completed for {len(loaded_tables)} core tables")
-            
-        except Exception as e:
-            logger.error(f"Error training with expanded schema: {e}")
-            logger.debug(traceback.format_exc())
+    def _get_critical_queries(self) -> Tuple[List[Dict], int]:
+        """
+        Load sample queries and keep those demonstrating core calculations.
+        
+        Returns:
+            tuple: (critical queries, total number of sample queries)
+        """
+        queries = self.training_loader.load_sample_queries()
+        
+        # Filter for conversion rate and core functionality examples
+        critical_queries = [
+            query for query in queries
+            if _CRITICAL_QUERY_PATTERN.search(query.get('question', ''))
+        ]
+        return critical_queries, len(queries)
+    
+    def _log_critical_training_summary(self, critical_count: int, total_count: int):
+        """Log the critical training data summary."""
+        # 📚 Organized training data logging
+        logger.info("📚 Critical Training Data Successfully Loaded:")
+        logger.info(f"   📝 Sample queries loaded: {critical_count} (filtered from {total_count} total)")
+        logger.info("   🎯 Focus areas: conversion rate calculations, price testing")
+        logger.info("✅ Critical training data loading completed")
     
     def _load_critical_training_data(self):
         """Load only critical training data to avoid token overflow."""
         try:
             # Load only the most important sample queries
-            queries = self.training_loader.load_sample_queries()
+            critical_queries, total_queries = self._get_critical_queries()
+            
+            # 🔇 Silence vanna loggers; train_batch prints nothing, so stdout is left
+            # alone to keep this safe on the background training thread
+            with _suppress_training_output(silence_stdout=False):
+                # Limit to prevent token overflow
+                self.vanna_instance.train_batch(
+                    question_sql_pairs=[(query['question'], query['sql']) for query in critical_queries[:10]],  # Only top 10 critical queries
+                    batch_size=self.config.get("training_batch_size", 50)
+                )
             
-            # Filter for conversion rate and core functionality examples
-            critical_queries = []
-            for query in queries:
-                question = query.get('question', '').lower()
-                # Include queries that demonstrate conversion rate calculations
-                if any(keyword in question for keyword in ['轉換率', 'conversion', '價格測試', 'price-test']):
-                    critical_queries.append(query)
-            
-            # 🔇 Comprehensive logging suppression for vanna and all dependencies
-            import sys
-            from io import StringIO
-            
-            # Store original stdout and loggers
-            original_stdout = sys.stdout
-            original_loggers = {}
-            
-            # List of all possible vanna-related loggers to suppress
-            logger_names = ['vanna', 'chromadb', 'openai', 'httpx', 'httpcore', '__main__']
-            
-            for logger_name in logger_names:
-                target_logger = logging.getLogger(logger_name)
-                original_loggers[logger_name] = target_logger.level
-                target_logger.setLevel(logging.CRITICAL)  # Suppress almost everything
-            
-            # Redirect stdout to catch print statements
-            captured_output = StringIO()
-            sys.stdout = captured_output
-            
-            # Limit to prevent token overflow
-            for query in critical_queries[:10]:  # Only top 10 critical queries
-                self.vanna_instance.train(question=query['question'], sql=query['sql'])
-            
-            # 🔊 Restore original stdout and log levels
-            sys.stdout = original_stdout
-            for logger_name, original_level in original_loggers.items():
-                logging.getLogger(logger_name).setLevel(original_level)
-            
-            # 📚 Organized training data logging
-            logger.info("📚 Critical Training Data Successfully Loaded:")
-            logger.info(f"   📝 Sample queries loaded: {len(critical_queries)} (filtered from {len(queries)} total)")
-            logger.info("   🎯 Focus areas: conversion rate calculations, price testing")
-            logger.info("✅ Critical training data loading completed")
+            self._log_critical_training_summary(len(critical_queries), total_queries)
             
         except Exception as e:
             logger.error(f"Error loading critical training data: {e}")
-            logger.debug(traceback.format_exc())
+            logger.debug("Traceback:", exc_info=True)
     
     def _load_training_data(self):
         """Load and train with sample queries and documents."""
         try:
-            # Load sample queries
+            # Load sample queries and documents, then train them in bulk
             queries = self.training_loader.load_sample_queries()
-            for query in queries:
-                self.vanna_instance.train(question=query['question'], sql=query['sql'])
-            
-            # Load documents
             documents = self.training_loader.load_documents()
-            for doc in documents:
-                self.vanna_instance.train(documentation=doc)
+            
+            self.vanna_instance.train_batch(
+                question_sql_pairs=[(query['question'], query['sql']) for query in queries],
+                documentation_list=documents,
+                batch_size=self.config.get("training_batch_size", 50)
+            )
             
             logger.info(f"Training data loaded: {len(queries)} queries, {len(documents)} documents")
             
         except Exception as e:
             logger.error(f"Error loading training data: {e}")
-            logger.debug(traceback.format_exc())
+            logger.debug("Traceback:", exc_info=True)
+    
+    async def _load_training_data_async(self):
+        """
+        Load and train with sample queries and documents, reading files concurrently.
+        
+        Query and document files are read in parallel worker threads; the blocking
+        training call runs in a thread as well so the event loop stays free.
+        """
+        try:
+            queries, documents = await asyncio.gather(
+                self.training_loader.load_sample_queries_async(),
+                self.training_loader.load_documents_async()
+            )
+            
+            await asyncio.to_thread(
+                self.vanna_instance.train_batch,
+                question_sql_pairs=[(query['question'], query['sql']) for query in queries],
+                documentation_list=documents,
+                batch_size=self.config.get("training_batch_size", 50)
+            )
+            self._invalidate_sql_cache()
+            
+            logger.info(f"Training data loaded: {len(queries)} queries, {len(documents)} documents")
+            
+        except Exception as e:
+            logger.error(f"Error loading training data: {e}")
+            logger.debug("Traceback:", exc_info=True)
     
     def _validate_question(self, question) -> bool:
         """Validate input question."""
         if not question or not isinstance(question, str) or not question.strip():
             return False
-        return True 
\ No newline at end of file
+        return True 
+
+
+def __getattr__(name):
+    """Resolve MyVanna lazily so importing this module does not load vanna."""
+    if name == "MyVanna":
+        from agent.custom_vanna import MyVanna
+        return MyVanna
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
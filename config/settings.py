@@ -38,11 +38,24 @@ logger = logging.getLogger(__name__)
 VANNA_API_KEY = os.getenv("VANNA_API_KEY")
 VANNA_MODEL_NAME = os.getenv("VANNA_MODEL", "gpt-4o-mini") # Default model
 VANNA_PERSIST_DIR = os.getenv("VANNA_PERSIST_DIR", "data/vanna_embeddings") # Default persist directory
+VANNA_CACHE_DIR = os.getenv("VANNA_CACHE_DIR", "data/cache") # Schema/DDL cache directory
+VANNA_CONVERSATION_DB = os.getenv("VANNA_CONVERSATION_DB", "") # SQLite conversation history (empty = in-memory only)
+VANNA_SCHEMA_CACHE_TTL = float(os.getenv("VANNA_SCHEMA_CACHE_TTL", "300")) # Seconds before the schema fingerprint is rechecked
 
 # Training control parameters
 VANNA_FORCE_RETRAIN = os.getenv("VANNA_FORCE_RETRAIN", "False").lower() == "true"
 VANNA_LOAD_TRAINING_ON_STARTUP = os.getenv("VANNA_LOAD_TRAINING_ON_STARTUP", "True").lower() == "true"
 VANNA_TRAINING_BATCH_SIZE = int(os.getenv("VANNA_TRAINING_BATCH_SIZE", "50"))
+VANNA_BACKGROUND_TRAINING = os.getenv("VANNA_BACKGROUND_TRAINING", "False").lower() == "true"
+
+# Concurrency control for batched question processing (caps in-flight OpenAI requests)
+VANNA_MAX_CONCURRENCY = int(os.getenv("VANNA_MAX_CONCURRENCY", "8"))
+
+# Semantic cache: reuse SQL for near-duplicate questions (cosine similarity threshold).
+# Opt-in: a hit skips generation and validation, and is only taken when both
+# questions contain the same literals (numbers, dates, quoted strings)
+VANNA_SEMANTIC_CACHE_ENABLED = os.getenv("VANNA_SEMANTIC_CACHE_ENABLED", "False").lower() == "true"
+VANNA_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("VANNA_SEMANTIC_CACHE_THRESHOLD", "0.92"))
 
 # Models that don't support temperature parameter
 MODELS_WITHOUT_TEMPERATURE = [
@@ -55,10 +68,18 @@ VANNA_CONFIG = {
     "api_key": VANNA_API_KEY,
     "model": VANNA_MODEL_NAME,
     "persist_directory": VANNA_PERSIST_DIR,
+    "cache_dir": VANNA_CACHE_DIR,
+    "conversation_db_path": VANNA_CONVERSATION_DB,
+    "schema_cache_ttl": VANNA_SCHEMA_CACHE_TTL,
     # Training control flags
     "force_retrain": VANNA_FORCE_RETRAIN,
     "load_training_on_startup": VANNA_LOAD_TRAINING_ON_STARTUP,
     "training_batch_size": VANNA_TRAINING_BATCH_SIZE,
+    "background_training": VANNA_BACKGROUND_TRAINING,
+    "max_concurrency": VANNA_MAX_CONCURRENCY,
+    # Semantic cache flags
+    "semantic_cache_enabled": VANNA_SEMANTIC_CACHE_ENABLED,
+    "semantic_cache_threshold": VANNA_SEMANTIC_CACHE_THRESHOLD,
     # Add other Vanna specific configurations here if needed
     # e.g., "allow_llm_to_see_data": True (This is often set during Vanna instance creation)
 }
@@ -92,6 +113,23 @@ DATABASE_CONFIG = {
     "password": POSTGRES_PASSWORD,
 }
 
+# Connection pool sizing (psycopg_pool); kept separate because DATABASE_CONFIG is passed to psycopg.connect
+POSTGRES_POOL_SIZE = int(os.getenv("POSTGRES_POOL_SIZE", "5"))
+POSTGRES_POOL_MAX_OVERFLOW = int(os.getenv("POSTGRES_POOL_MAX_OVERFLOW", "5"))
+
+# Hard cap on rows read back for generated SQL (protects the app from unbounded result sets)
+POSTGRES_MAX_RESULT_ROWS = int(os.getenv("POSTGRES_MAX_RESULT_ROWS", "100000"))
+
+DATABASE_POOL_CONFIG = {
+    "min_size": POSTGRES_POOL_SIZE,
+    "max_size": POSTGRES_POOL_SIZE + POSTGRES_POOL_MAX_OVERFLOW,
+    "max_lifetime": float(os.getenv("POSTGRES_POOL_RECYCLE", "1800")),  # seconds before a connection is recycled
+    "timeout": float(os.getenv("POSTGRES_POOL_TIMEOUT", "30")),  # seconds to wait for a free connection
+    # Server-side prepared statements: prepare after N executions, keep up to prepared_max per connection
+    "prepare_threshold": int(os.getenv("POSTGRES_PREPARE_THRESHOLD", "2")),
+    "prepared_max": int(os.getenv("POSTGRES_PREPARED_MAX", "256")),
+}
+
 # Application Configuration
 DEBUG_MODE = os.getenv("DEBUG", "False").lower() == "true"
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -102,5 +140,6 @@ if __name__ == '__main__':
     print(f"Environment File: {env_filename}")
     print(f"Loaded VANNA_CONFIG: {VANNA_CONFIG}")
     print(f"Loaded DATABASE_CONFIG: {DATABASE_CONFIG}")
+    print(f"Loaded DATABASE_POOL_CONFIG: {DATABASE_POOL_CONFIG}")
     print(f"Debug Mode: {DEBUG_MODE}")
     print(f"Log Level: {LOG_LEVEL}") 
\ No newline at end of file
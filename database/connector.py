@@ -1,170 +1,363 @@
 """
 PostgreSQL database connector for chatalyst_ai.
 """
+import asyncio
 import logging
+import threading
+import uuid
+from dataclasses import dataclass
+from types import MappingProxyType
+
 import psycopg
 import pandas as pd
+from psycopg.types.string import TextLoader
+from psycopg_pool import ConnectionPool
 # Updated import: Use DATABASE_CONFIG directly from settings
-from config.settings import DATABASE_CONFIG 
+from config.settings import DATABASE_CONFIG, DATABASE_POOL_CONFIG
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass(slots=True)
+class QueryResult:
+    """Outcome of a statement that returns no rows (INSERT, UPDATE, DELETE, DDL)."""
+    rows_affected: int
+    status: str = "Query executed successfully"
+
+
 class PostgreSQLConnector:
     """
     PostgreSQL database connector class for handling database operations.
+    Queries borrow connections from a bounded pool so concurrent callers
+    reuse established sessions instead of reconnecting.
     """
-    def __init__(self, config_kwargs: dict | None = None):
+    FETCH_CHUNK_SIZE = 10000  # Rows converted to Python objects at a time when building DataFrames
+
+    def __init__(self, config_kwargs: dict | None = None, pool_kwargs: dict | None = None):
         """
         Initialize the connector with configuration.
         
         Args:
             config_kwargs (dict, optional): Database connection keyword arguments. 
                                        Defaults to DATABASE_CONFIG from settings.py.
+            pool_kwargs (dict, optional): Pool sizing (min_size, max_size, max_lifetime, timeout).
+                                       Defaults to DATABASE_POOL_CONFIG from settings.py.
         """
         # Prioritize passed config, then DATABASE_CONFIG from settings
         if config_kwargs:
             self.config_kwargs = config_kwargs
         else:
             self.config_kwargs = DATABASE_CONFIG # Use DATABASE_CONFIG directly
+        self.pool_kwargs = {**DATABASE_POOL_CONFIG, **(pool_kwargs or {})}
+        # psycopg keyword arguments, normalized once instead of on every (re)connect
+        self._conn_kwargs = MappingProxyType(self._normalize_conn_kwargs(self.config_kwargs))
             
-        self.connection = None
-        # self.cursor = None # Cursor is typically method-local
+        self.pool: ConnectionPool | None = None
+        # Guards pool creation: the connector is shared by every session's agent
+        self._pool_lock = threading.Lock()
+    
+    @staticmethod
+    def _normalize_conn_kwargs(config_kwargs: dict) -> dict:
+        """Translate settings-style config into psycopg.connect keyword arguments."""
+        conn_kwargs = dict(config_kwargs)
+        
+        # psycopg v3 expects dbname, ensure it's present from Pydantic model or legacy dict
+        if 'database' in conn_kwargs and 'dbname' not in conn_kwargs:
+            conn_kwargs['dbname'] = conn_kwargs.pop('database')
+        
+        if 'port' in conn_kwargs and isinstance(conn_kwargs['port'], str):
+            conn_kwargs['port'] = int(conn_kwargs['port'])
+        return conn_kwargs
     
     def connect(self) -> bool:
         """
-        Establish connection to the PostgreSQL database.
+        Open the connection pool and warm it up to its minimum size.
+        Calling this while the pool is already open is a no-op.
         
         Returns:
-            bool: True if connection successful, False otherwise.
+            bool: True if the pool is ready, False otherwise.
         """
+        if self.pool is not None and not self.pool.closed:
+            return True
+
+        with self._pool_lock:
+            # Another caller may have opened the pool while we waited
+            if self.pool is not None and not self.pool.closed:
+                return True
+            return self._open_pool()
+
+    def _open_pool(self) -> bool:
+        """Create and warm up the connection pool (caller holds _pool_lock)."""
         try:
-            conn_kwargs = self.config_kwargs.copy()
-            
-            # psycopg v3 expects dbname, ensure it's present from Pydantic model or legacy dict
-            if 'database' in conn_kwargs and 'dbname' not in conn_kwargs:
-                conn_kwargs['dbname'] = conn_kwargs.pop('database')
-            
-            if 'port' in conn_kwargs and isinstance(conn_kwargs['port'], str):
-                conn_kwargs['port'] = int(conn_kwargs['port'])
-            
-            logger.info(f"Attempting to connect to PostgreSQL with: { {k: v for k, v in conn_kwargs.items() if k != 'password'} }") # Log without password
-            self.connection = psycopg.connect(**conn_kwargs)
-            # self.connection.row_factory = psycopg.rows.dict_row # dict_row is default for cursor with execute
-            logger.info("Successfully connected to PostgreSQL database.")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Attempting to connect to PostgreSQL with: %s",
+                            {k: v for k, v in self._conn_kwargs.items() if k != 'password'}) # Log without password
+            self.pool = ConnectionPool(
+                # Autocommit: SELECTs run without BEGIN, so a failed read needs no ROLLBACK round trip
+                kwargs={
+                    **self._conn_kwargs,
+                    "autocommit": True,
+                    # Repeated SQL text is prepared server-side, skipping Parse on later executions
+                    "prepare_threshold": self.pool_kwargs["prepare_threshold"],
+                },
+                configure=self._configure_connection,
+                min_size=self.pool_kwargs["min_size"],
+                max_size=self.pool_kwargs["max_size"],
+                max_lifetime=self.pool_kwargs["max_lifetime"],
+                timeout=self.pool_kwargs["timeout"],
+                check=ConnectionPool.check_connection, # Ping on checkout so stale connections are replaced
+                open=False,
+            )
+            # Block until min_size connections exist so the first query doesn't pay the handshake
+            self.pool.open(wait=True, timeout=self.pool_kwargs["timeout"])
+            logger.info(
+                f"Successfully connected to PostgreSQL database "
+                f"(pool min_size={self.pool.min_size}, max_size={self.pool.max_size})."
+            )
             return True
-        except psycopg.Error as e: # Catch psycopg specific errors
+        except psycopg.Error as e: # Catch psycopg specific errors (including PoolTimeout)
             logger.error(f"Error connecting to PostgreSQL database: {e}")
-            logger.debug(f"Connection arguments used (excluding password): {{k: v for k, v in conn_kwargs.items() if k != 'password'}}")
-            self.connection = None # Ensure connection is None on failure
+            self._close_pool()
             return False
         except Exception as e:
             logger.error(f"Unexpected error connecting to PostgreSQL database: {e}")
-            self.connection = None
+            self._close_pool()
             return False
     
     def disconnect(self):
         """
-        Close the database connection.
+        Close the connection pool and all pooled connections.
         """
-        if self.connection and not self.connection.closed:
-            self.connection.close()
-            logger.info("Disconnected from PostgreSQL database.")
-        self.connection = None
+        with self._pool_lock:
+            if self.pool and not self.pool.closed:
+                self._close_pool()
+                logger.info("Disconnected from PostgreSQL database.")
+            self.pool = None
+
+    def _configure_connection(self, conn: psycopg.Connection) -> None:
+        """Apply per-connection settings when the pool creates a connection."""
+        conn.prepared_max = self.pool_kwargs["prepared_max"]
+
+    @staticmethod
+    def _load_json_as_text(cur: psycopg.Cursor) -> None:
+        """
+        Return json/jsonb columns as the server's text on this cursor only, instead
+        of parsing them into dicts that display callers would re-serialize.
+        """
+        for json_type in ("json", "jsonb"):
+            cur.adapters.register_loader(json_type, TextLoader)
+
+    def _close_pool(self):
+        """Close the pool (if any) without raising."""
+        if self.pool is not None:
+            try:
+                self.pool.close()
+            except Exception as e:
+                logger.warning(f"Error closing connection pool: {e}")
+        self.pool = None
     
-    def execute_query(self, query: str, params: tuple | dict | None = None) -> pd.DataFrame | None:
+    def execute_query(self, query: str, params: tuple | dict | None = None,
+                      chunksize: int | None = None,
+                      max_rows: int | None = None,
+                      json_as_text: bool = False) -> pd.DataFrame | QueryResult | None:
         """
         Execute a SQL query and return results as a pandas DataFrame.
         
         Args:
             query (str): SQL query to execute.
             params (tuple or dict, optional): Parameters for the query. Defaults to None.
+            chunksize (int, optional): If set, the query (which must be a SELECT) is read
+                through a server-side cursor in chunks of this many rows and collected
+                column-wise, instead of fetching every row at once.
+            max_rows (int, optional): With chunksize, stop reading after this many rows.
+                The remaining rows are never transferred and the DataFrame is marked
+                with df.attrs["truncated"] = True.
+            json_as_text (bool): Return json/jsonb values as their text instead of
+                parsed dicts/lists (for callers that only display them).
             
         Returns:
-            pandas.DataFrame: Query results as DataFrame or None if an error occurs.
+            pandas.DataFrame: Query results as DataFrame for statements that return rows,
+                QueryResult for statements that don't, or None if an error occurs.
         """
         try:
-            if not self.connection or self.connection.closed:
-                logger.info("Connection is not active. Attempting to reconnect.")
-                if not self.connect():
-                    logger.error("Failed to establish database connection for query execution.")
-                    return None
-            
-            # Ensure self.connection is not None after attempting to connect
-            if not self.connection:
-                 logger.error("Database connection is None even after connect attempt.")
-                 return None
+            if (self.pool is None or self.pool.closed) and not self.connect():
+                logger.error("Failed to establish database connection for query execution.")
+                return None
 
-            with self.connection.cursor(row_factory=psycopg.rows.dict_row) as cur:
-                logger.debug(f"Executing query: {query} with params: {params}")
+            if chunksize:
+                return self._execute_query_chunked(query, params, chunksize, max_rows, json_as_text)
+
+            # Pooled connections are in autocommit mode, so errors leave no transaction to roll back
+            # Plain tuple rows: column names come once from the cursor description
+            with self.pool.connection() as conn, conn.cursor() as cur:
+                if json_as_text:
+                    self._load_json_as_text(cur)
+                logger.debug("Executing query: %s with params: %s", query, params)
                 cur.execute(query, params)
                 
                 # Check if query is a SELECT or similar that returns rows
                 if cur.description:
-                    rows = cur.fetchall()
-                    df = pd.DataFrame(rows) if rows else pd.DataFrame()
-                    logger.info(f"Query executed successfully, returned {len(df)} rows.")
+                    df = self._fetch_dataframe(cur, self.FETCH_CHUNK_SIZE)
+                    logger.info("Query executed successfully, returned %d rows.", len(df))
                     return df
                 else:
-                    # For non-SELECT queries (INSERT, UPDATE, DELETE), commit changes
-                    self.connection.commit()
-                    logger.info(f"Non-SELECT query executed successfully. Rows affected: {cur.rowcount}")
-                    # Return a status or row count for non-SELECT might be useful
-                    return pd.DataFrame([{"status": "Query executed successfully", "rows_affected": cur.rowcount}])
+                    # Non-SELECT queries (INSERT, UPDATE, DELETE) are committed by autocommit
+                    logger.info("Non-SELECT query executed successfully. Rows affected: %d", cur.rowcount)
+                    return QueryResult(rows_affected=cur.rowcount)
                 
         except psycopg.Error as e: # Catch psycopg specific errors
             logger.error(f"Database error executing query: {query} - {e}")
-            if self.connection and not self.connection.closed:
-                try:
-                    self.connection.rollback()
-                    logger.info("Transaction rolled back due to error.")
-                except psycopg.Error as rb_e:
-                    logger.error(f"Error during rollback: {rb_e}")
             return None
         except Exception as e:
             logger.error(f"Unexpected error executing query: {query} - {e}")
             return None
     
+    def fetch_rows(self, query: str, params: tuple | dict | None = None) -> list[dict] | None:
+        """
+        Execute a query and return its rows as dictionaries, without building a DataFrame.
+        
+        Intended for small internal lookups (catalog queries, fingerprints) where
+        the pandas construction cost would exceed the query itself.
+        
+        Args:
+            query (str): SQL query to execute (must return rows).
+            params (tuple or dict, optional): Parameters for the query. Defaults to None.
+            
+        Returns:
+            list[dict]: Rows as dictionaries, or None if an error occurs.
+        """
+        try:
+            if (self.pool is None or self.pool.closed) and not self.connect():
+                logger.error("Failed to establish database connection for query execution.")
+                return None
+
+            with self.pool.connection() as conn, conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
+                logger.debug("Fetching rows: %s with params: %s", query, params)
+                cur.execute(query, params)
+                return cur.fetchall()
+        except psycopg.Error as e:
+            logger.error(f"Database error executing query: {query} - {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error executing query: {query} - {e}")
+            return None
+    
+    async def execute_query_async(self, query: str, params: tuple | dict | None = None,
+                                  chunksize: int | None = None,
+                                  max_rows: int | None = None,
+                                  json_as_text: bool = False) -> pd.DataFrame | QueryResult | None:
+        """
+        Async variant of execute_query for asyncio callers.
+        
+        Each call borrows its own pooled connection on a worker thread, so several
+        queries can run in parallel with asyncio.gather (bounded by the pool's max_size).
+        Arguments are the same as execute_query, including the max_rows cap.
+        
+        Returns:
+            Same as execute_query.
+        """
+        return await asyncio.to_thread(self.execute_query, query, params, chunksize, max_rows, json_as_text)
+    
+    def _execute_query_chunked(self, query: str, params: tuple | dict | None, chunksize: int,
+                               max_rows: int | None = None, json_as_text: bool = False) -> pd.DataFrame:
+        """
+        Read a SELECT through a server-side cursor, chunksize rows per round trip.
+        Rows beyond max_rows stay on the server and are discarded with the cursor.
+        """
+        with self.pool.connection() as conn, conn.transaction(), conn.cursor(
+            name=f"chatalyst_{uuid.uuid4().hex}"
+        ) as cur:
+            cur.itersize = chunksize
+            if json_as_text:
+                self._load_json_as_text(cur)
+            logger.debug("Executing query in chunks of %d: %s with params: %s", chunksize, query, params)
+            cur.execute(query, params)
+            df = self._fetch_dataframe(cur, chunksize, max_rows)
+        
+        if df.attrs.get("truncated"):
+            logger.warning("Query result truncated to %d rows (max_rows limit).", len(df))
+        logger.info("Query executed successfully, returned %d rows.", len(df))
+        return df
+    
+    @staticmethod
+    def _fetch_dataframe(cur: psycopg.Cursor, chunk_size: int, max_rows: int | None = None) -> pd.DataFrame:
+        """
+        Fetch the cursor's remaining rows into a DataFrame, column by column.
+        
+        Rows are fetched chunk_size at a time and each chunk is transposed into
+        per-column lists, so only one chunk of row tuples is alive at a time and
+        pandas receives column arrays rather than row records. When max_rows is
+        given, fetching stops once it is reached and df.attrs["truncated"] is set
+        if more rows were available.
+        """
+        columns = [column.name for column in cur.description]
+        column_values = [[] for _ in columns]
+        row_count = 0
+        truncated = False
+        while True:
+            size = chunk_size
+            if max_rows is not None:
+                # Fetch one row past the limit to detect truncation
+                size = min(chunk_size, max_rows + 1 - row_count)
+            rows = cur.fetchmany(size)
+            if not rows:
+                break
+            if max_rows is not None and row_count + len(rows) > max_rows:
+                rows = rows[:max_rows - row_count]
+                truncated = True
+            row_count += len(rows)
+            for values, chunk_values in zip(column_values, zip(*rows)):
+                values.extend(chunk_values)
+            if truncated:
+                break
+        
+        # Duplicate column names (e.g. from joins) are kept by building from arrays, not a dict
+        df = pd.DataFrame(dict(enumerate(column_values)), copy=False)
+        df.columns = columns
+        df.attrs["truncated"] = truncated
+        return df
+    
     def get_schema_info(self) -> dict:
         """
         Get database schema information (tables, columns, data types, nullability).
         
+        Tables and their columns are fetched with a single query.
+        
         Returns:
             dict: Schema information organized by table_name. 
                   Each table has a list of column_info dicts.
                   Returns empty dict if an error occurs or no tables found.
         """
-        schema_info = {}
-        tables_query = """
-        SELECT table_name 
-        FROM information_schema.tables 
-        WHERE table_schema = 'public' AND table_type = 'BASE TABLE'
-        ORDER BY table_name;
+        # LEFT JOIN keeps tables without columns so they still appear with an empty list
+        schema_query = """
+        SELECT t.table_name, c.column_name, c.data_type, c.udt_name, c.is_nullable,
+               c.column_default, c.character_maximum_length, c.numeric_precision, c.numeric_scale
+        FROM information_schema.tables t
+        LEFT JOIN information_schema.columns c
+               ON c.table_schema = t.table_schema AND c.table_name = t.table_name
+        WHERE t.table_schema = 'public' AND t.table_type = 'BASE TABLE'
+        ORDER BY t.table_name, c.ordinal_position;
         """
         try:
-            tables_df = self.execute_query(tables_query)
-            
-            if tables_df is None or tables_df.empty:
-                logger.warning("No tables found in 'public' schema or error fetching tables.")
+            rows = self.fetch_rows(schema_query)
+            if rows is None:
+                logger.error("Error fetching schema information.")
+                return {}
+            if not rows:
+                logger.warning("No tables found in 'public' schema.")
                 return {}
 
-            for _, row in tables_df.iterrows():
-                table_name = row['table_name']
-                columns_query = """
-                SELECT column_name, data_type, udt_name, is_nullable,
-                       column_default, character_maximum_length, numeric_precision, numeric_scale
-                FROM information_schema.columns
-                WHERE table_schema = 'public' AND table_name = %s
-                ORDER BY ordinal_position;
-                """
-                columns_df = self.execute_query(columns_query, (table_name,))
-                
-                if columns_df is not None and not columns_df.empty:
-                    schema_info[table_name] = columns_df.to_dict('records')
-                else:
-                    logger.warning(f"No columns found for table '{table_name}' or error fetching columns.")
-                    schema_info[table_name] = [] # Add empty list if no columns
+            schema_info = {}
+            for row in rows:
+                table_columns = schema_info.setdefault(row.pop('table_name'), [])
+                if row['column_name'] is not None:
+                    table_columns.append(row)
+
+            for table_name, table_columns in schema_info.items():
+                if not table_columns:
+                    logger.warning(f"No columns found for table '{table_name}'.")
             
-            logger.info(f"Successfully retrieved schema for {len(schema_info)} tables.")
+            logger.info("Successfully retrieved schema for %d tables.", len(schema_info))
             return schema_info
         except Exception as e:
             logger.error(f"Error getting schema info: {e}")
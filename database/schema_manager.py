@@ -2,37 +2,290 @@
 Schema management module for Vanna AI training.
 """
 import logging
-from typing import Dict, List, Tuple
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Single-round-trip fingerprint of the public schema, used to validate the disk cache.
+# Catalog row versions (xmin) change whenever a relation, column or default is
+# created or altered; the counts catch drops. Much cheaper than hashing
+# information_schema.columns, which is a view over several catalog joins.
+SCHEMA_VERSION_QUERY = """
+SELECT concat_ws(':',
+    (SELECT count(*) || '/' || COALESCE(max(c.xmin::text::bigint), 0)
+       FROM pg_catalog.pg_class c
+      WHERE c.relnamespace = 'public'::regnamespace),
+    (SELECT count(*) || '/' || COALESCE(max(a.xmin::text::bigint), 0)
+       FROM pg_catalog.pg_attribute a
+       JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+      WHERE c.relnamespace = 'public'::regnamespace AND a.attnum > 0),
+    (SELECT count(*) || '/' || COALESCE(max(d.xmin::text::bigint), 0)
+       FROM pg_catalog.pg_attrdef d
+       JOIN pg_catalog.pg_class c ON c.oid = d.adrelid
+      WHERE c.relnamespace = 'public'::regnamespace)
+) AS schema_version;
+"""
+
+
+# PostgreSQL type names shown in shortened form in generated DDL
+_DATA_TYPE_ALIASES = {
+    'timestamp with time zone': "TIMESTAMPTZ",
+    'timestamp without time zone': "TIMESTAMP",
+}
+
+
+# Low-cardinality column attributes repeated across most columns ('integer', 'YES', 'id', ...)
+_INTERNED_COLUMN_FIELDS = ('column_name', 'data_type', 'udt_name', 'is_nullable')
+
+
+def _intern_schema_strings(schema_info: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+    """Intern repeated column attribute strings in place so duplicates share one object."""
+    for columns in schema_info.values():
+        for column in columns:
+            for field in _INTERNED_COLUMN_FIELDS:
+                value = column.get(field)
+                if isinstance(value, str):
+                    column[field] = sys.intern(value)
+    return schema_info
+
+
+# DDL comments for key columns (identifier columns first, then JSONB columns)
+_KEY_COLUMN_COMMENTS = {
+    'id': " -- id: Primary/Foreign key identifier",
+    'experiment_id': " -- experiment_id: Primary/Foreign key identifier",
+    'store_name': " -- store_name: Store identification field",
+}
+_JSONB_COLUMN_COMMENT = " -- JSONB column for flexible configuration"
+
+# Special table descriptions appended after the table DDL
+_TABLE_NOTES = {
+    'experiments': "\n-- Main experiments table with unified ID system\n-- Use experiments.id for all PostgreSQL table joins\n-- experiment_goal: Defines calculation metric (conversion_rate, average_order_value, revenue_per_visitor)",
+    'experiment_daily_metrics': "\n-- Precomputed daily metrics for fast analytics\n-- IMPORTANT: Uses is_control_group for control group identification\n-- Join: experiments.id = experiment_daily_metrics.experiment_id\n-- Contains: views, orders, sales_revenue for uplift calculations\n-- PRIORITY: Always use this table instead of raw event tables",
+    'experiment_groups': "\n-- Individual test groups within experiments\n-- IMPORTANT: Uses is_control_group (unified with experiment_daily_metrics)\n-- Join: experiments.id = experiment_groups.experiment_id"
+}
+
 
 class SchemaManager:
     """
     Manages database schema information and DDL generation for Vanna AI training.
     """
     
-    def __init__(self, db_connector):
+    CACHE_FILENAME = "schema_cache_{dbname}.json"
+    CACHE_FORMAT_VERSION = 2  # Bump when generated DDL changes so cached DDL is rebuilt
+    
+    def __init__(self, db_connector, cache_dir: Optional[str] = None, cache_ttl: Optional[float] = None):
         """
         Initialize schema manager.
         
         Args:
             db_connector: Database connector instance
+            cache_dir (str, optional): Directory for the on-disk schema/DDL cache.
+                If None, schema information is only cached in memory.
+            cache_ttl (float, optional): Seconds before the in-memory schema is
+                revalidated against the database fingerprint. None keeps it for
+                the lifetime of the process.
         """
         self.db_connector = db_connector
+        self.cache_ttl = cache_ttl
         self._schema_cache = None
+        self._schema_loaded_at = 0.0
+        self._ddl_cache: Dict[str, str] = {}
+        # Column-name set derived from the schema dict it was built from
+        self._all_columns_cache: FrozenSet[str] = frozenset()
+        self._all_columns_source: Optional[Dict] = None
+        self._schema_version: Optional[str] = None
+        self._cache_path = Path(cache_dir) / self._cache_filename() if cache_dir else None
+        # Serializes cold loads so concurrent callers share one introspection pass
+        self._lock = threading.Lock()
     
     def get_schema_info(self) -> Dict:
         """
         Get cached schema information.
         
+        When a disk cache is configured and the database schema fingerprint is
+        unchanged, the per-table information_schema queries are skipped.
+        
         Returns:
             dict: Schema information organized by table name
         """
-        if self._schema_cache is None:
-            self._schema_cache = self.db_connector.get_schema_info()
+        if self._schema_cache is not None and not self._is_schema_stale():
+            return self._schema_cache
+        
+        with self._lock:
+            # Another caller may have refreshed the cache while we waited
+            if self._schema_cache is not None and not self._is_schema_stale():
+                return self._schema_cache
+            
+            # The fingerprint is only needed to validate the disk cache or a TTL refresh
+            current_version = None
+            if self._cache_path is not None or self.cache_ttl is not None:
+                current_version = self._get_schema_version()
+            
+            if self._schema_cache is not None:
+                # TTL expired: only rebuild if the schema fingerprint actually changed.
+                # If it cannot be fetched, keep serving the cached schema instead of
+                # risking an empty reload from a database that is not responding.
+                if current_version is None or current_version == self._schema_version:
+                    self._schema_loaded_at = time.monotonic()
+                    return self._schema_cache
+            
+            if not self._load_disk_cache(current_version):
+                schema_info = self.db_connector.get_schema_info()
+                if not schema_info and self._schema_cache:
+                    logger.warning("Schema reload returned no tables - keeping cached schema")
+                    self._schema_loaded_at = time.monotonic()
+                    return self._schema_cache
+                self._schema_cache = schema_info
+                self._ddl_cache = {}
+                self._schema_version = current_version
+                self._save_disk_cache()
+            _intern_schema_strings(self._schema_cache)
+            self._schema_loaded_at = time.monotonic()
         return self._schema_cache
     
+    def invalidate_schema_cache(self) -> None:
+        """Drop cached schema information and DDL so the next call reloads them."""
+        with self._lock:
+            self._schema_cache = None
+            self._ddl_cache = {}
+            self._schema_version = None
+        logger.info("Schema cache invalidated")
+    
+    def _cache_filename(self) -> str:
+        """Cache file name for the connector's database, so databases don't share a cache."""
+        config = getattr(self.db_connector, 'config_kwargs', None) or {}
+        dbname = config.get('dbname') or config.get('database') or 'default'
+        return self.CACHE_FILENAME.format(dbname=dbname)
+    
+    def _is_schema_stale(self) -> bool:
+        """Check whether the in-memory schema has outlived the configured TTL."""
+        return self.cache_ttl is not None and time.monotonic() - self._schema_loaded_at >= self.cache_ttl
+    
+    def get_table_ddls(self, table_names: Iterable[str]) -> Dict[str, str]:
+        """
+        Get enhanced DDL for the given tables, reusing cached DDL when available.
+        
+        Args:
+            table_names: Names of the tables to generate DDL for
+            
+        Returns:
+            dict: DDL statements keyed by table name (schema order, existing tables only)
+        """
+        wanted = set(table_names)
+        return dict(self._iter_ddls(lambda table_name: table_name in wanted))
+    
+    def iter_all_ddls(self) -> Iterator[str]:
+        """
+        Yield the enhanced DDL of every table in schema order.
+        
+        Callers can join or write the statements directly (e.g.
+        "\n\n".join(schema_manager.iter_all_ddls())) without building an
+        intermediate list of per-table strings.
+        
+        Yields:
+            str: DDL statement for one table
+        """
+        for _, ddl in self._iter_ddls(lambda table_name: True):
+            yield ddl
+    
+    def _iter_ddls(self, include: Callable[[str], bool]) -> Iterator[Tuple[str, str]]:
+        """
+        Yield (table_name, ddl) for tables accepted by include, generating and
+        caching DDL on demand. The disk cache is rewritten once at the end if
+        anything new was generated.
+        """
+        schema_info = self.get_schema_info()
+        generated = False
+        try:
+            for table_name, columns in schema_info.items():
+                if not include(table_name):
+                    continue
+                ddl = self._ddl_cache.get(table_name)
+                if ddl is None:
+                    ddl = self.generate_enhanced_ddl(table_name, columns)
+                    self._ddl_cache[table_name] = ddl
+                    generated = True
+                yield table_name, ddl
+        finally:
+            if generated:
+                self._save_disk_cache()
+    
+    def _get_schema_version(self) -> Optional[str]:
+        """Fetch the schema fingerprint from the database (None on error)."""
+        try:
+            rows = self.db_connector.fetch_rows(SCHEMA_VERSION_QUERY)
+            if not rows:
+                return None
+            return rows[0]['schema_version']
+        except Exception as e:
+            logger.warning(f"Error fetching schema version: {e}")
+            return None
+    
+    def _load_disk_cache(self, schema_version: Optional[str]) -> bool:
+        """
+        Load schema info and DDL from disk if the cached schema version still matches.
+        
+        Args:
+            schema_version: Current schema fingerprint (None if unavailable)
+            
+        Returns:
+            bool: True if the cache was loaded
+        """
+        if self._cache_path is None:
+            return False
+        
+        if schema_version is None or not self._cache_path.exists():
+            return False
+        
+        try:
+            with open(self._cache_path, 'rb') as f:
+                cached = orjson.loads(f.read())
+        except Exception as e:
+            logger.warning(f"Error reading schema cache {self._cache_path}: {e}")
+            return False
+        
+        if cached.get('format_version') != self.CACHE_FORMAT_VERSION:
+            logger.info("Schema cache format changed - refreshing schema cache")
+            return False
+        
+        if cached.get('schema_version') != schema_version:
+            logger.info("Schema changed since last run - refreshing schema cache")
+            return False
+        
+        self._schema_cache = cached.get('schema_info', {})
+        self._ddl_cache = cached.get('ddl', {})
+        self._schema_version = schema_version
+        logger.info(f"Loaded schema for {len(self._schema_cache)} tables from cache")
+        return True
+    
+    def _save_disk_cache(self) -> None:
+        """Persist schema info and DDL for the current schema version."""
+        if self._cache_path is None or self._schema_version is None or not self._schema_cache:
+            return
+        
+        payload = {
+            'format_version': self.CACHE_FORMAT_VERSION,
+            'schema_version': self._schema_version,
+            'schema_info': self._schema_cache,
+            'ddl': self._ddl_cache
+        }
+        try:
+            self._cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._cache_path.with_suffix('.tmp')
+            with open(tmp_path, 'wb') as f:
+                # numpy scalars from pandas are serialized natively; anything else falls back to str
+                f.write(orjson.dumps(payload, default=str, option=orjson.OPT_SERIALIZE_NUMPY))
+            os.replace(tmp_path, self._cache_path)
+        except Exception as e:
+            logger.warning(f"Error writing schema cache {self._cache_path}: {e}")
+    
     def generate_enhanced_ddl(self, table_name: str, columns: List[Dict]) -> str:
         """
         Generate enhanced DDL with detailed column information and constraints.
@@ -44,8 +297,6 @@ class SchemaManager:
         Returns:
             str: Enhanced DDL statement with comments
         """
-        ddl = f"-- Table: {table_name}\n"
-        ddl += f"CREATE TABLE {table_name} (\n"
         column_defs = []
         
         for column in columns:
@@ -59,24 +310,23 @@ class SchemaManager:
             # Normalize data types
             data_type = self._normalize_data_type(data_type, column)
             
-            column_def = f"    {column_name} {data_type} {nullable_str}"
-            
             # Add default value if exists
-            if column_default and column_default != 'NULL':
-                column_def += f" DEFAULT {column_default}"
+            default_str = f" DEFAULT {column_default}" if column_default and column_default != 'NULL' else ""
             
             # Add comments for important columns
-            column_def += self._get_column_comment(column_name, data_type)
-            
-            column_defs.append(column_def)
-        
-        ddl += ",\n".join(column_defs)
-        ddl += "\n);"
+            column_defs.append(
+                f"    {column_name} {data_type} {nullable_str}{default_str}"
+                f"{self._get_column_comment(column_name, data_type)}"
+            )
         
-        # Add table-specific notes
-        ddl += self._get_table_notes(table_name)
-        
-        return ddl
+        # Single join at the end instead of repeated string concatenation
+        column_block = ",\n".join(column_defs)
+        return (
+            f"-- Table: {table_name}\n"
+            f"CREATE TABLE {table_name} (\n"
+            f"{column_block}\n);"
+            f"{self._get_table_notes(table_name)}"  # Add table-specific notes
+        )
     
     def generate_table_documentation(self, table_name: str, columns: List[Dict]) -> str:
         """
@@ -89,68 +339,50 @@ class SchemaManager:
         Returns:
             str: Table documentation string
         """
-        doc = f"Table: {table_name}\n"
-        doc += f"Columns: {', '.join([col['column_name'] for col in columns])}\n"
-        
-        # Add specific documentation for key tables
-        table_docs = {
-            'experiments': self._get_experiments_doc(),
-            'shops': self._get_shops_doc(),
-            'storewide_views': self._get_storewide_views_doc()
-        }
+        column_names = ', '.join(col['column_name'] for col in columns)
         
-        if table_name in table_docs:
-            doc += table_docs[table_name]
+        # Add specific documentation for key tables (only the matching builder runs)
+        doc_builder = self._TABLE_DOC_BUILDERS.get(table_name)
+        table_doc = doc_builder(self) if doc_builder else ""
         
-        return doc
+        return f"Table: {table_name}\nColumns: {column_names}\n{table_doc}"
     
-    def get_all_column_names(self) -> set:
+    def get_all_column_names(self) -> FrozenSet[str]:
         """
         Get all column names from all tables.
         
+        The set is built once per loaded schema and reused until the schema
+        information is reloaded.
+        
         Returns:
-            set: Set of all column names
+            frozenset: Set of all column names
         """
         schema_info = self.get_schema_info()
-        all_columns = set()
-        
-        for table_name, columns in schema_info.items():
-            for col in columns:
-                all_columns.add(col['column_name'])
-        
-        return all_columns
+        if self._all_columns_source is not schema_info:
+            self._all_columns_cache = frozenset(
+                col['column_name'] for columns in schema_info.values() for col in columns
+            )
+            self._all_columns_source = schema_info
+        return self._all_columns_cache
     
     def _normalize_data_type(self, data_type: str, column: Dict) -> str:
         """Normalize PostgreSQL data types for better readability."""
         if data_type == 'character varying':
             max_length = column.get('character_maximum_length')
             return f"VARCHAR({max_length})" if max_length else "VARCHAR"
-        elif data_type == 'timestamp with time zone':
-            return "TIMESTAMPTZ"
-        elif data_type == 'timestamp without time zone':
-            return "TIMESTAMP"
-        return data_type
+        return _DATA_TYPE_ALIASES.get(data_type, data_type)
     
     def _get_column_comment(self, column_name: str, data_type: str) -> str:
         """Get appropriate comment for column."""
         # Identify key columns for special handling
-        if column_name in ['id', 'experiment_id']:
-            return f"{column_name}: Primary/Foreign key identifier"
-        elif column_name == 'store_name':
-            return f"{column_name}: Store identification field"
-        elif 'jsonb' in data_type.lower():
-            return " -- JSONB column for flexible configuration"
-        return ""
+        comment = _KEY_COLUMN_COMMENTS.get(column_name)
+        if comment is not None:
+            return comment
+        return _JSONB_COLUMN_COMMENT if 'jsonb' in data_type.lower() else ""
     
     def _get_table_notes(self, table_name: str) -> str:
         """Get table-specific notes."""
-        # Special table descriptions
-        special_descriptions = {
-            'experiments': "\n-- Main experiments table with unified ID system\n-- Use experiments.id for all PostgreSQL table joins\n-- experiment_goal: Defines calculation metric (conversion_rate, average_order_value, revenue_per_visitor)",
-            'experiment_daily_metrics': "\n-- Precomputed daily metrics for fast analytics\n-- IMPORTANT: Uses is_control_group for control group identification\n-- Join: experiments.id = experiment_daily_metrics.experiment_id\n-- Contains: views, orders, sales_revenue for uplift calculations\n-- PRIORITY: Always use this table instead of raw event tables",
-            'experiment_groups': "\n-- Individual test groups within experiments\n-- IMPORTANT: Uses is_control_group (unified with experiment_daily_metrics)\n-- Join: experiments.id = experiment_groups.experiment_id"
-        }
-        return special_descriptions.get(table_name, "")
+        return _TABLE_NOTES.get(table_name, "")
     
     def _get_experiments_doc(self) -> str:
         """Get experiments table documentation."""
@@ -185,4 +417,11 @@ Key columns:
 - session_id: User session identifier
 - device_type: mobile, desktop, tablet
 - search_params: JSONB with UTM and tracking parameters
-""" 
\ No newline at end of file
+""" 
+    
+    # Table documentation builders, looked up by table name
+    _TABLE_DOC_BUILDERS = {
+        'experiments': _get_experiments_doc,
+        'shops': _get_shops_doc,
+        'storewide_views': _get_storewide_views_doc
+    }
@@ -0,0 +1,10 @@
+"""
+Shared pytest setup: modules are imported top-level (e.g. validation.sql_validator),
+so the project root has to be importable.
+"""
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
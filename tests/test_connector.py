@@ -0,0 +1,69 @@
+"""
+Tests for PostgreSQLConnector result building, using a fake cursor instead of a database.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from database.connector import PostgreSQLConnector
+
+
+class FakeCursor:
+    """Cursor stub serving fixed rows through fetchmany."""
+
+    def __init__(self, columns, rows):
+        self.description = [SimpleNamespace(name=name) for name in columns]
+        self.rows = list(rows)
+        self.fetch_sizes = []
+
+    def fetchmany(self, size):
+        self.fetch_sizes.append(size)
+        chunk, self.rows = self.rows[:size], self.rows[size:]
+        return chunk
+
+
+def _rows(count):
+    return [(index, f"name{index}") for index in range(count)]
+
+
+def test_fetch_dataframe_reads_all_rows_in_chunks():
+    cur = FakeCursor(['id', 'name'], _rows(7))
+    df = PostgreSQLConnector._fetch_dataframe(cur, chunk_size=3)
+
+    assert list(df.columns) == ['id', 'name']
+    assert df['id'].tolist() == list(range(7))
+    assert df.attrs["truncated"] is False
+    assert cur.fetch_sizes == [3, 3, 3, 3]
+
+
+@pytest.mark.parametrize("row_count, expected_rows, truncated", [
+    (4, 4, False),
+    (5, 5, False),
+    (6, 5, True),
+    (50, 5, True),
+])
+def test_fetch_dataframe_caps_rows(row_count, expected_rows, truncated):
+    cur = FakeCursor(['id', 'name'], _rows(row_count))
+    df = PostgreSQLConnector._fetch_dataframe(cur, chunk_size=2, max_rows=5)
+
+    assert len(df) == expected_rows
+    assert df['id'].tolist() == list(range(expected_rows))
+    assert df.attrs["truncated"] is truncated
+    # Never reads more than one row past the limit
+    assert row_count - len(cur.rows) <= 6
+
+
+def test_fetch_dataframe_keeps_duplicate_columns():
+    cur = FakeCursor(['id', 'id'], [(1, 2), (3, 4)])
+    df = PostgreSQLConnector._fetch_dataframe(cur, chunk_size=10)
+
+    assert list(df.columns) == ['id', 'id']
+    assert df.values.tolist() == [[1, 2], [3, 4]]
+
+
+def test_fetch_dataframe_empty_result():
+    df = PostgreSQLConnector._fetch_dataframe(FakeCursor(['id'], []), chunk_size=10, max_rows=5)
+
+    assert list(df.columns) == ['id']
+    assert df.empty
+    assert df.attrs["truncated"] is False
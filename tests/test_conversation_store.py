@@ -0,0 +1,189 @@
+"""
+Tests for ConversationStore: queued writes, replacement, trimming and per-session flushing.
+"""
+import threading
+
+import pytest
+
+from agent.conversation_store import ConversationStore
+
+
+def _question(text):
+    return {'type': 'question', 'original_question': text, 'processed_question': text, 'sql': None}
+
+
+def _session_rows(store, session_id):
+    store.flush()
+    with store._lock:
+        return [row[0] for row in store._connection.execute(
+            "SELECT processed_question FROM messages WHERE session_id = ? ORDER BY id", (session_id,)
+        )]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ConversationStore(str(tmp_path / "db" / "conversations.db"), max_entries_per_session=3)
+
+
+def test_add_and_read_back(store):
+    store.add('s1', _question('first'))
+    store.add('s1', _question('second'))
+    store.add('s1', {'type': 'answer', 'processed_question': None})
+
+    assert store.get_last_question('s1') == 'second'
+    summary = store.get_summary('s1')
+    assert summary['total_questions'] == 2
+    assert summary['last_question_time'] is not None
+
+
+def test_add_copies_entry(store):
+    entry = _question('original')
+    store.add('s1', entry)
+    entry['processed_question'] = 'mutated'
+    assert store.get_last_question('s1') == 'original'
+
+
+def test_sessions_are_isolated(store):
+    store.add('s1', _question('one'))
+    store.add('s2', _question('two'))
+    assert store.get_last_question('s1') == 'one'
+    assert store.get_last_question('s2') == 'two'
+    assert store.get_last_question('missing') is None
+    assert store.get_summary('missing') == {'total_questions': 0, 'last_question_time': None}
+
+
+def test_trims_to_most_recent_entries(store):
+    for index in range(5):
+        store.add('s1', _question(f'q{index}'))
+    assert _session_rows(store, 's1') == ['q2', 'q3', 'q4']
+
+
+def test_replace_swaps_session_entries(store):
+    store.add('s1', _question('old'))
+    store.add('s2', _question('other'))
+    store.replace('s1', [_question('a'), _question('b'), _question('c'), _question('d')])
+
+    assert _session_rows(store, 's1') == ['b', 'c', 'd']
+    assert _session_rows(store, 's2') == ['other']
+
+
+def test_clear_removes_pending_and_stored_entries(store):
+    store.add('s1', _question('q'))
+    store.clear('s1')
+    assert store.get_last_question('s1') is None
+
+
+def test_writes_run_on_writer_thread(store, monkeypatch):
+    writer_threads = []
+    original_write = store._write
+
+    def recording_write(*args, **kwargs):
+        writer_threads.append(threading.current_thread())
+        return original_write(*args, **kwargs)
+
+    monkeypatch.setattr(store, '_write', recording_write)
+    store.add('s1', _question('q'))
+    store.flush()
+    assert writer_threads == [store._writer]
+    assert store._pending == {}
+
+
+def test_flush_session_only_waits_for_own_session(store):
+    release = threading.Event()
+    original_write = store._write
+
+    def blocking_write(session_id, *args, **kwargs):
+        if session_id == 'slow':
+            release.wait(5)
+        return original_write(session_id, *args, **kwargs)
+
+    store._write = blocking_write
+    store.add('slow', _question('blocked'))
+    # The writer is blocked on 'slow'; 's2' has nothing pending so it reads immediately
+    assert store.get_last_question('s2') is None
+
+    done = threading.Event()
+    reader = threading.Thread(target=lambda: (store.flush_session('slow'), done.set()))
+    reader.start()
+    assert not done.wait(0.1)
+    release.set()
+    reader.join(5)
+    assert done.is_set()
+    assert store.get_last_question('slow') == 'blocked'
+
+
+def test_full_queue_drops_oldest_write(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.db"), max_pending_writes=1)
+    release = threading.Event()
+    started = threading.Event()
+    original_write = store._write
+
+    def blocking_write(session_id, *args, **kwargs):
+        if session_id == 'blocker':
+            started.set()
+            release.wait(5)
+        return original_write(session_id, *args, **kwargs)
+
+    store._write = blocking_write
+    store.add('blocker', _question('in flight'))
+    assert started.wait(5)
+    store.add('s1', _question('dropped'))
+    store.add('s1', _question('kept'))
+    release.set()
+
+    assert _session_rows(store, 's1') == ['kept']
+    assert store._pending == {}
+
+
+def test_full_queue_retries_when_freed_slot_is_taken(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.db"), max_pending_writes=1)
+    release = threading.Event()
+    started = threading.Event()
+    original_write = store._write
+
+    def blocking_write(session_id, *args, **kwargs):
+        if session_id == 'blocker':
+            started.set()
+            release.wait(5)
+        return original_write(session_id, *args, **kwargs)
+
+    store._write = blocking_write
+    store.add('blocker', _question('in flight'))
+    assert started.wait(5)
+    store.add('s1', _question('dropped'))
+
+    write_queue = store._write_queue
+    original_put = write_queue.put_nowait
+    puts = []
+
+    def racing_put(item):
+        puts.append(item[0])
+        if len(puts) == 2:
+            # Another session refills the slot freed by the drop before the retry
+            store.add('s2', _question('racer'))
+        return original_put(item)
+
+    write_queue.put_nowait = racing_put
+    store.add('s1', _question('kept'))
+    del write_queue.put_nowait
+    release.set()
+
+    reader = threading.Thread(target=store.flush_session, args=('s1',), daemon=True)
+    reader.start()
+    reader.join(2)
+    assert not reader.is_alive()
+    assert _session_rows(store, 's1') == ['kept']
+    assert store._pending == {}
+
+
+def test_failed_enqueue_does_not_block_readers(store, monkeypatch):
+    def failing_put(item):
+        raise RuntimeError("queue unavailable")
+
+    monkeypatch.setattr(store._write_queue, 'put_nowait', failing_put)
+    with pytest.raises(RuntimeError):
+        store.add('s1', _question('lost'))
+    monkeypatch.undo()
+
+    assert store._pending == {}
+    assert store.get_last_question('s1') is None
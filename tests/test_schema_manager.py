@@ -0,0 +1,153 @@
+"""
+Tests for SchemaManager caching: in-memory reuse, TTL revalidation, fingerprint fallback and the disk cache.
+"""
+import orjson
+import pytest
+
+from database.schema_manager import SchemaManager
+
+
+def _schema(*column_names):
+    return {'campaigns': [
+        {'column_name': name, 'data_type': 'integer', 'is_nullable': 'NO'} for name in column_names
+    ]}
+
+
+class FakeConnector:
+    """Connector stub returning a configurable schema and fingerprint."""
+
+    def __init__(self, schema_info, version='v1'):
+        self.schema_info = schema_info
+        self.version = version
+        self.config_kwargs = {'dbname': 'testdb'}
+        self.schema_loads = 0
+        self.version_queries = 0
+
+    def get_schema_info(self):
+        self.schema_loads += 1
+        return self.schema_info
+
+    def fetch_rows(self, query):
+        self.version_queries += 1
+        if isinstance(self.version, Exception):
+            raise self.version
+        return [{'schema_version': self.version}] if self.version is not None else []
+
+
+def _expire(manager):
+    manager._schema_loaded_at -= manager.cache_ttl + 1
+
+
+def test_schema_is_loaded_once():
+    connector = FakeConnector(_schema('id'))
+    manager = SchemaManager(connector)
+
+    assert manager.get_schema_info() == _schema('id')
+    assert manager.get_schema_info() is manager.get_schema_info()
+    assert connector.schema_loads == 1
+    # No disk cache and no TTL: the fingerprint is never needed
+    assert connector.version_queries == 0
+
+
+def test_invalidate_forces_reload():
+    connector = FakeConnector(_schema('id'))
+    manager = SchemaManager(connector)
+    manager.get_schema_info()
+
+    manager.invalidate_schema_cache()
+    connector.schema_info = _schema('id', 'status')
+    assert manager.get_schema_info() == _schema('id', 'status')
+    assert connector.schema_loads == 2
+
+
+def test_ttl_unchanged_fingerprint_keeps_cache():
+    connector = FakeConnector(_schema('id'))
+    manager = SchemaManager(connector, cache_ttl=60)
+    first = manager.get_schema_info()
+
+    _expire(manager)
+    assert manager.get_schema_info() is first
+    assert connector.schema_loads == 1
+    assert connector.version_queries == 2
+    assert not manager._is_schema_stale()
+
+
+def test_ttl_changed_fingerprint_reloads():
+    connector = FakeConnector(_schema('id'))
+    manager = SchemaManager(connector, cache_ttl=60)
+    manager.get_schema_info()
+
+    connector.schema_info = _schema('id', 'status')
+    connector.version = 'v2'
+    _expire(manager)
+    assert manager.get_schema_info() == _schema('id', 'status')
+    assert manager.get_all_column_names() == frozenset({'id', 'status'})
+    assert connector.schema_loads == 2
+
+
+@pytest.mark.parametrize("version", [None, RuntimeError("connection lost")])
+def test_ttl_missing_fingerprint_keeps_cache(version):
+    connector = FakeConnector(_schema('id'))
+    manager = SchemaManager(connector, cache_ttl=60)
+    first = manager.get_schema_info()
+
+    connector.version = version
+    connector.schema_info = {}
+    _expire(manager)
+    assert manager.get_schema_info() is first
+    assert connector.schema_loads == 1
+
+
+def test_ttl_empty_reload_keeps_cache():
+    connector = FakeConnector(_schema('id'))
+    manager = SchemaManager(connector, cache_ttl=60)
+    first = manager.get_schema_info()
+
+    connector.version = 'v2'
+    connector.schema_info = {}
+    _expire(manager)
+    assert manager.get_schema_info() is first
+    assert connector.schema_loads == 2
+
+    # The failed reload must not record the new fingerprint, so the next expiry retries
+    connector.schema_info = _schema('id', 'status')
+    _expire(manager)
+    assert manager.get_schema_info() == _schema('id', 'status')
+
+def test_disk_cache_reused_across_instances(tmp_path):
+    connector = FakeConnector(_schema('id'))
+    SchemaManager(connector, cache_dir=str(tmp_path)).get_schema_info()
+
+    assert SchemaManager(connector, cache_dir=str(tmp_path)).get_schema_info() == _schema('id')
+    assert connector.schema_loads == 1
+
+
+def test_disk_cache_ignored_when_fingerprint_changes(tmp_path):
+    connector = FakeConnector(_schema('id'))
+    SchemaManager(connector, cache_dir=str(tmp_path)).get_schema_info()
+
+    connector.version = 'v2'
+    connector.schema_info = _schema('id', 'status')
+    assert SchemaManager(connector, cache_dir=str(tmp_path)).get_schema_info() == _schema('id', 'status')
+    assert connector.schema_loads == 2
+
+
+def test_disk_cache_not_used_without_fingerprint(tmp_path):
+    connector = FakeConnector(_schema('id'))
+    SchemaManager(connector, cache_dir=str(tmp_path)).get_schema_info()
+
+    connector.version = None
+    connector.schema_info = _schema('id', 'status')
+    assert SchemaManager(connector, cache_dir=str(tmp_path)).get_schema_info() == _schema('id', 'status')
+
+
+def test_disk_cache_is_keyed_by_database(tmp_path):
+    connector = FakeConnector(_schema('id'))
+    SchemaManager(connector, cache_dir=str(tmp_path)).get_schema_info()
+    cached = orjson.loads((tmp_path / "schema_cache_testdb.json").read_bytes())
+    assert cached['schema_version'] == 'v1'
+
+    other = FakeConnector(_schema('order_id'))
+    other.config_kwargs = {'dbname': 'otherdb'}
+    assert SchemaManager(other, cache_dir=str(tmp_path)).get_schema_info() == _schema('order_id')
+    assert other.schema_loads == 1
@@ -0,0 +1,118 @@
+"""
+Tests for SQLValidator: fast path, clause anchors, alias extraction and column checks.
+"""
+import pytest
+
+from validation.sql_validator import SQLValidator
+
+
+class FakeSchemaManager:
+    """Schema manager stub exposing a fixed column set."""
+
+    def __init__(self, columns):
+        self.columns = frozenset(columns)
+
+    def get_all_column_names(self):
+        return self.columns
+
+
+@pytest.fixture
+def validator():
+    return SQLValidator(FakeSchemaManager(['id', 'Name', 'campaign_budget', 'status', 'created_at']))
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT id FROM campaigns",
+    "  select id from campaigns",
+    "WITH t AS (SELECT id FROM campaigns) SELECT * FROM t",
+    "-- top campaigns\nSELECT id FROM campaigns",
+    "/* note */ SELECT id FROM campaigns",
+    "(SELECT id FROM a) UNION (SELECT id FROM b)",
+    "SELECT id FROM events WHERE event_type = 'delete'",
+    "SELECT \"drop\" FROM events",
+    "SELECT id FROM events -- never DROP this\n",
+    "SELECT id FROM events /* UPDATE later */",
+    "SELECT updated_at FROM events",
+])
+def test_fast_path_accepts_read_only_queries(validator, sql):
+    assert validator._fast_reject(sql) is None
+
+
+@pytest.mark.parametrize("sql", [
+    "DROP TABLE campaigns",
+    "SELECT id FROM campaigns; DELETE FROM campaigns",
+    "WITH d AS (DELETE FROM campaigns RETURNING id) SELECT * FROM d",
+    "select 1; update campaigns set status = 'x'",
+    "SELECT 'it''s' AS x; TRUNCATE campaigns",
+])
+def test_fast_path_rejects_write_statements(validator, sql):
+    assert validator._fast_reject(sql) == "Only read-only SELECT queries are allowed"
+
+
+@pytest.mark.parametrize("sql", ["", None, "EXPLAIN SELECT 1", "show tables"])
+def test_fast_path_rejects_non_select(validator, sql):
+    assert validator._fast_reject(sql) == "Invalid SQL structure"
+
+
+def test_validate_sql_accepts_keyword_in_literal(validator):
+    assert validator.validate_sql("SELECT id FROM events WHERE event_type = 'delete'", "") == (True, None)
+
+
+def test_scan_anchors_finds_first_clause_positions():
+    sql = "select a, b from t order by a"
+    assert SQLValidator._scan_anchors(sql) == (0, sql.index("from"), sql.index("order by"))
+
+
+def test_scan_anchors_skips_literals_comments_and_identifiers():
+    sql = ("select 'from' as a, \"order by\" as b, from_date -- from here\n"
+           "/* select */ from t order   by a")
+    select_pos, from_pos, order_by_pos = SQLValidator._scan_anchors(sql)
+    assert select_pos == 0
+    assert from_pos == sql.index("from t")
+    assert order_by_pos == sql.index("order   by")
+
+
+def test_scan_anchors_missing_clauses():
+    assert SQLValidator._scan_anchors("with x as (values (1)) table x") == (-1, -1, -1)
+
+
+def test_extract_select_aliases(validator):
+    sql = ("select count(*) as total, sum(revenue) revenue_sum, status, "
+           "case when x then 1 end as flag, distinct_id from t")
+    aliases = validator._extract_select_aliases(sql, SQLValidator._scan_anchors(sql))
+    assert aliases == {'total', 'revenue_sum', 'flag'}
+
+
+def test_extract_select_aliases_without_from(validator):
+    sql = "select 1 as one"
+    assert validator._extract_select_aliases(sql, SQLValidator._scan_anchors(sql)) == set()
+
+
+def test_validate_sql_rejects_unknown_column(validator):
+    is_valid, error = validator.validate_sql("SELECT id FROM campaigns WHERE budget > 100", "")
+    assert not is_valid
+    assert error == "Column 'budget' does not exist in schema"
+
+
+def test_validate_sql_allows_select_alias(validator):
+    sql = "SELECT SUM(campaign_budget) AS budget FROM campaigns ORDER BY budget DESC"
+    assert validator.validate_sql(sql, "") == (True, None)
+
+
+def test_validate_sql_rejects_error_reply(validator):
+    assert validator.validate_sql("SELECT 'Sorry, I cannot answer that'", "") == (
+        False, "AI returned error message instead of SQL"
+    )
+
+
+def test_validate_sql_cte_uses_strict_patterns(validator):
+    # revenue is only checked outside CTEs; clicks is checked everywhere
+    assert validator.validate_sql("WITH t AS (SELECT revenue FROM s) SELECT * FROM t", "") == (True, None)
+    is_valid, error = validator.validate_sql("WITH t AS (SELECT s.clicks FROM s) SELECT * FROM t", "")
+    assert not is_valid
+    assert error == "Column 'clicks' does not exist in schema"
+
+
+def test_validate_many_keeps_input_order(validator):
+    results = validator.validate_many(["SELECT id FROM t", "DROP TABLE t"])
+    assert results == [(True, None), (False, "Only read-only SELECT queries are allowed")]
@@ -0,0 +1,105 @@
+"""
+Tests for TrainingDataLoader: query/document parsing, validation and file caching.
+"""
+import asyncio
+import os
+
+import orjson
+import pytest
+
+from training.training_loader import MMAP_THRESHOLD_BYTES, TrainingDataLoader
+
+
+def _write_queries(path, queries):
+    path.write_bytes(orjson.dumps({'queries': queries}))
+
+
+@pytest.fixture
+def training_dir(tmp_path):
+    (tmp_path / "sample_queries").mkdir()
+    (tmp_path / "documents").mkdir()
+    return tmp_path
+
+
+def test_load_sample_queries_filters_invalid_entries(training_dir):
+    _write_queries(training_dir / "sample_queries" / "a.json", [
+        {'question': 'How many campaigns?', 'sql': 'SELECT COUNT(*) FROM campaigns'},
+        {'question': '   ', 'sql': 'SELECT 1'},
+        {'question': 'Missing sql'},
+        {'question': 'Wrong type', 'sql': 42},
+        'not a dict',
+    ])
+    queries = TrainingDataLoader(str(training_dir)).load_sample_queries()
+    assert queries == [{'question': 'How many campaigns?', 'sql': 'SELECT COUNT(*) FROM campaigns'}]
+
+
+def test_load_sample_queries_skips_empty_broken_and_nested_files(training_dir):
+    sample_dir = training_dir / "sample_queries"
+    _write_queries(sample_dir / "good.json", [{'question': 'q', 'sql': 'SELECT 1'}])
+    (sample_dir / "empty.json").write_bytes(b"")
+    (sample_dir / "broken.json").write_bytes(b"{not json")
+    (sample_dir / "notes.txt").write_text("ignored")
+    (sample_dir / "nested").mkdir()
+    _write_queries(sample_dir / "nested" / "deep.json", [{'question': 'deep', 'sql': 'SELECT 2'}])
+
+    queries = TrainingDataLoader(str(training_dir)).load_sample_queries()
+    assert queries == [{'question': 'q', 'sql': 'SELECT 1'}]
+
+
+def test_load_sample_queries_missing_directory(tmp_path):
+    assert TrainingDataLoader(str(tmp_path / "missing")).load_sample_queries() == []
+
+
+def test_load_sample_queries_async_matches_sync(training_dir):
+    for index in range(3):
+        _write_queries(training_dir / "sample_queries" / f"{index}.json",
+                       [{'question': f'q{index}', 'sql': f'SELECT {index}'}])
+    loader = TrainingDataLoader(str(training_dir))
+    assert asyncio.run(loader.load_sample_queries_async()) == loader.load_sample_queries()
+
+
+def test_query_file_parse_is_cached_until_file_changes(training_dir):
+    query_file = training_dir / "sample_queries" / "a.json"
+    _write_queries(query_file, [{'question': 'q1', 'sql': 'SELECT 1'}])
+    loader = TrainingDataLoader(str(training_dir))
+
+    first = loader._load_query_file(str(query_file))
+    assert loader._load_query_file(str(query_file)) is first
+
+    _write_queries(query_file, [{'question': 'q1', 'sql': 'SELECT 1'}, {'question': 'q2', 'sql': 'SELECT 2'}])
+    st = os.stat(query_file)
+    os.utime(query_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert [query['question'] for query in loader._load_query_file(str(query_file))] == ['q1', 'q2']
+
+
+def test_load_documents_recurses_and_skips_hidden_and_empty(training_dir):
+    docs_dir = training_dir / "documents"
+    (docs_dir / "intro.md").write_text("  # Intro\n\nText.\n", encoding="utf-8")
+    (docs_dir / "empty.md").write_text("", encoding="utf-8")
+    (docs_dir / "blank.md").write_text("   \n", encoding="utf-8")
+    (docs_dir / "guides").mkdir()
+    (docs_dir / "guides" / "metrics.md").write_text("指標說明", encoding="utf-8")
+    (docs_dir / ".hidden").mkdir()
+    (docs_dir / ".hidden" / "secret.md").write_text("hidden", encoding="utf-8")
+    (docs_dir / "node_modules").mkdir()
+    (docs_dir / "node_modules" / "pkg.md").write_text("vendored", encoding="utf-8")
+
+    documents = TrainingDataLoader(str(training_dir)).load_documents()
+    assert sorted(documents) == sorted(["# Intro\n\nText.", "指標說明"])
+
+
+def test_load_large_document(training_dir):
+    content = "x" * (MMAP_THRESHOLD_BYTES + 10)
+    (training_dir / "documents" / "large.md").write_text(f"\n{content}\n", encoding="utf-8")
+    assert TrainingDataLoader(str(training_dir)).load_documents() == [content]
+
+
+def test_get_training_summary(training_dir):
+    _write_queries(training_dir / "sample_queries" / "a.json",
+                   [{'question': 'q1', 'sql': 'SELECT 1'}, {'question': 'q2', 'sql': 'SELECT 2'}])
+    (training_dir / "documents" / "sub").mkdir()
+    (training_dir / "documents" / "sub" / "doc.md").write_text("doc", encoding="utf-8")
+
+    summary = TrainingDataLoader(str(training_dir)).get_training_summary()
+    assert summary['sample_queries'] == {'total_files': 1, 'total_queries': 2, 'files': ['a.json']}
+    assert summary['documents'] == {'total_files': 1, 'files': [os.path.join('sub', 'doc.md')]}
@@ -0,0 +1,105 @@
+"""
+Tests for VannaAgent behavior that does not need OpenAI, Chroma or PostgreSQL.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from agent.vanna_agent import VannaAgent
+
+
+class FakeConnector:
+    """Connector stub; the tests below never reach the database."""
+
+    config_kwargs = {'dbname': 'testdb'}
+
+
+@pytest.fixture
+def agent():
+    agent = VannaAgent(config={'api_key': 'test', 'model': 'test-model', 'max_concurrency': 2},
+                       db_connector=FakeConnector())
+    agent.initialized = True
+    return agent
+
+
+def test_ask_many_keeps_order_and_caps_concurrency(agent):
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+
+    def fake_ask(question):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        # Earlier questions finish last, so gather order is what keeps results aligned
+        time.sleep(0.05 * (5 - int(question[1:])))
+        with lock:
+            active -= 1
+        return {'question': question}
+
+    agent.ask = fake_ask
+    questions = [f"q{index}" for index in range(5)]
+    results = asyncio.run(agent.ask_many(questions))
+
+    assert [result['question'] for result in results] == questions
+    assert peak == 2
+
+
+def test_ask_many_explicit_limit_overrides_config(agent):
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+
+    def fake_ask(question):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+        return {'question': question}
+
+    agent.ask = fake_ask
+    asyncio.run(agent.ask_many([f"q{index}" for index in range(4)], max_concurrency=1))
+    assert peak == 1
+
+
+def test_ask_many_reports_initialization_failure(agent):
+    agent.initialized = False
+    agent.initialize = lambda: False
+    assert asyncio.run(agent.ask_many(['a', 'b'])) == [
+        {'error': 'Vanna AI agent not initialized', 'question': 'a'},
+        {'error': 'Vanna AI agent not initialized', 'question': 'b'},
+    ]
+
+
+def test_sql_cache_key_normalizes_whitespace(agent):
+    key = agent._sql_cache_key("How many  campaigns\tare active?")
+    assert agent._sql_cache_key("  How many campaigns\nare active? ") == key
+    # Case is kept because literals in questions can be case-sensitive
+    assert agent._sql_cache_key("how many campaigns are active?") != key
+
+
+def test_sql_cache_key_changes_with_schema_version(agent):
+    key = agent._sql_cache_key("How many campaigns?")
+    agent._schema_version += 1
+    assert agent._sql_cache_key("How many campaigns?") != key
+
+
+def test_set_conversation_history_copies_and_orders_entries(agent):
+    entries = [{'type': 'question', 'processed_question': f'q{index}'} for index in range(25)]
+    agent.set_conversation_history(entries)
+
+    assert all('timestamp_ns' not in entry for entry in entries)
+    history = list(agent.conversation_history)
+    assert [entry['processed_question'] for entry in history] == [f'q{index}' for index in range(5, 25)]
+    timestamps = [entry['timestamp_ns'] for entry in history]
+    assert timestamps == sorted(set(timestamps))
+
+    agent._add_to_conversation_history({'type': 'question', 'processed_question': 'next'})
+    assert agent.conversation_history[-1]['timestamp_ns'] > timestamps[-1]
+    assert agent._get_last_question() == 'next'
@@ -1,6 +1,7 @@
 """
 Prompt management module for Vanna AI system instructions.
 """
+import functools
 import logging
 
 logger = logging.getLogger(__name__)
@@ -119,6 +120,21 @@ ORDER BY month;
 "Cannot generate query based on current database structure. Please check available tables and columns or rephrase your question."
 """
     
+    @staticmethod
+    @functools.cache
+    def get_static_prompt_prefix() -> str:
+        """
+        Get the combined static prompt used as the fixed prefix of every SQL prompt.
+        
+        The content is deterministic (no timestamps or IDs) so the provider-side
+        prompt cache can match it byte-for-byte across requests. It is built once
+        per process and the same string object is returned afterwards.
+        
+        Returns:
+            str: System prompt followed by schema enforcement instructions
+        """
+        return f"{PromptManager.get_system_prompt()}\n\n{PromptManager.get_schema_enforcement_prompt()}"
+    
     @staticmethod
     def get_schema_enforcement_prompt() -> str:
         """
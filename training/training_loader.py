@@ -2,14 +2,48 @@
 Training data loader for Vanna AI agent.
 Automatically loads sample queries and documents from the training_data directory.
 """
-import json
+import asyncio
+import functools
 import logging
+import mmap
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Documents larger than this are memory-mapped instead of read into a buffer
+MMAP_THRESHOLD_BYTES = 64 * 1024
+
+# Directories never descended into when walking training data (hidden ones are skipped too)
+_SKIPPED_DIRS = frozenset({"__pycache__", "node_modules"})
+
+# Shared pool for training file reads, created on first use and reused across loaders
+_read_executor: Optional[ThreadPoolExecutor] = None
+_read_executor_lock = threading.Lock()
+
+
+def _get_read_executor() -> ThreadPoolExecutor:
+    """
+    Get the process-wide executor used to read training files in parallel.
+    
+    Returns:
+        ThreadPoolExecutor: Shared executor (I/O bound, so sized above the CPU count)
+    """
+    global _read_executor
+    if _read_executor is None:
+        with _read_executor_lock:
+            if _read_executor is None:
+                _read_executor = ThreadPoolExecutor(
+                    max_workers=min(32, (os.cpu_count() or 1) * 4),
+                    thread_name_prefix="training-loader"
+                )
+    return _read_executor
+
 
 class TrainingDataLoader:
     """
@@ -35,6 +69,39 @@ class TrainingDataLoader:
         self.sample_queries_path = self.training_data_path / "sample_queries"
         self.documents_path = self.training_data_path / "documents"
     
+    @staticmethod
+    def _iter_files(root, suffix: str, recursive: bool = True) -> Iterator[str]:
+        """
+        Yield paths of regular files under root whose names end with suffix.
+        
+        Walks with os.scandir so the directory entry's cached file type is
+        reused instead of constructing a Path and calling stat() per entry.
+        Hidden and cache directories are skipped before recursing.
+        
+        Args:
+            root: Directory to walk.
+            suffix (str): File name suffix to match (e.g. ".md").
+            recursive (bool): Descend into subdirectories.
+            
+        Yields:
+            str: Path of each matching file.
+        """
+        stack = [os.scandir(root)]
+        try:
+            while stack:
+                entry = next(stack[-1], None)
+                if entry is None:
+                    stack.pop().close()
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and not entry.name.startswith(".") and entry.name not in _SKIPPED_DIRS:
+                        stack.append(os.scandir(entry.path))
+                elif entry.name.endswith(suffix) and entry.is_file(follow_symlinks=False):
+                    yield entry.path
+        finally:
+            for iterator in stack:
+                iterator.close()
+    
     def load_sample_queries(self) -> List[Dict]:
         """
         Load all sample queries from JSON files in the sample_queries directory.
@@ -49,40 +116,105 @@ class TrainingDataLoader:
             return queries
         
         # Find all JSON files in sample_queries directory
-        json_files = list(self.sample_queries_path.glob("*.json"))
+        json_files = list(self._iter_files(self.sample_queries_path, ".json", recursive=False))
         
         if not json_files:
             logger.warning(f"No JSON files found in: {self.sample_queries_path}")
             return queries
         
-        for json_file in json_files:
-            try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                # Extract queries from the file
-                file_queries = data.get('queries', [])
-                
-                # Validate and add queries
-                for query in file_queries:
-                    if self._validate_query(query):
-                        queries.append(query)
-                    else:
-                        logger.warning(f"Invalid query format in {json_file}: {query}")
-                
-                # Only log file loading summary, not individual file details
-                logger.debug(f"Loaded {len(file_queries)} queries from {json_file.name}")
-                
-            except json.JSONDecodeError as e:
-                logger.error(f"Error parsing JSON file {json_file}: {e}")
-            except Exception as e:
-                logger.error(f"Error loading queries from {json_file}: {e}")
+        # Read files in parallel; map keeps the results in file order
+        for file_queries in _get_read_executor().map(self._load_query_file, json_files):
+            queries.extend(file_queries)
         
         # Final summary only
         if queries:
             logger.info(f"📄 Sample queries loaded: {len(queries)} from {len(json_files)} files")
         return queries
     
+    async def load_sample_queries_async(self) -> List[Dict]:
+        """
+        Load sample queries with all JSON files read concurrently.
+        
+        File reads run in worker threads so slow or networked storage does not
+        block the event loop.
+        
+        Returns:
+            List[Dict]: List of query dictionaries with 'question' and 'sql' keys.
+        """
+        if not self.sample_queries_path.exists():
+            logger.warning(f"Sample queries directory not found: {self.sample_queries_path}")
+            return []
+        
+        json_files = list(self._iter_files(self.sample_queries_path, ".json", recursive=False))
+        if not json_files:
+            logger.warning(f"No JSON files found in: {self.sample_queries_path}")
+            return []
+        
+        loop = asyncio.get_running_loop()
+        executor = _get_read_executor()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(executor, self._load_query_file, json_file) for json_file in json_files)
+        )
+        queries = [query for file_queries in results for query in file_queries]
+        
+        if queries:
+            logger.info(f"📄 Sample queries loaded: {len(queries)} from {len(json_files)} files")
+        return queries
+    
+    def _load_query_file(self, json_file: str) -> Tuple[Dict, ...]:
+        """
+        Load and validate the queries of a single JSON file.
+        
+        Parsed results are reused while the file's mtime and size are unchanged;
+        the cached tuple is returned as-is, so callers must not mutate it.
+        
+        Args:
+            json_file (str): Sample query file path.
+            
+        Returns:
+            Tuple[Dict, ...]: Valid queries from the file (empty on error).
+        """
+        try:
+            st = os.stat(json_file)
+            if st.st_size == 0:
+                # An empty file cannot hold a queries object; skip it without opening
+                logger.warning(f"Empty sample query file: {json_file}")
+                return ()
+            return self._parse_query_file(json_file, st.st_mtime_ns, st.st_size)
+        except orjson.JSONDecodeError as e:
+            logger.error(f"Error parsing JSON file {json_file}: {e}")
+        except Exception as e:
+            logger.error(f"Error loading queries from {json_file}: {e}")
+        return ()
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _parse_query_file(json_file: str, mtime_ns: int, size: int) -> Tuple[Dict, ...]:
+        """
+        Parse and validate a query file (cached by path, mtime and size).
+        
+        Returns:
+            Tuple[Dict, ...]: Valid queries from the file.
+        """
+        # orjson parses straight from bytes, skipping the text decoding layer
+        with open(json_file, 'rb') as f:
+            data = orjson.loads(f.read())
+        
+        # Extract queries from the file
+        file_queries = data.get('queries', [])
+        
+        # Validate and add queries
+        queries = []
+        for query in file_queries:
+            if TrainingDataLoader._validate_query(query):
+                queries.append(query)
+            else:
+                logger.warning(f"Invalid query format in {json_file}: {query}")
+        
+        # Only log file loading summary, not individual file details
+        logger.debug(f"Loaded {len(file_queries)} queries from {os.path.basename(json_file)}")
+        return tuple(queries)
+    
     def load_documents(self) -> List[str]:
         """
         Load all documents from Markdown files in the documents directory.
@@ -97,33 +229,101 @@ class TrainingDataLoader:
             return documents
         
         # Find all Markdown files recursively in documents directory
-        md_files = list(self.documents_path.rglob("*.md"))
+        md_files = list(self._iter_files(self.documents_path, ".md"))
         
         if not md_files:
             logger.warning(f"No Markdown files found in: {self.documents_path}")
             return documents
         
-        for md_file in md_files:
-            try:
-                with open(md_file, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                
-                if content:
-                    documents.append(content)
-                    # Only debug log individual documents
-                    logger.debug(f"Loaded document: {md_file.relative_to(self.documents_path)}")
-                else:
-                    logger.warning(f"Empty document: {md_file}")
-                
-            except Exception as e:
-                logger.error(f"Error loading document {md_file}: {e}")
+        # Read files in parallel; map keeps the results in file order
+        for content in _get_read_executor().map(self._load_document_file, md_files):
+            if content:
+                documents.append(content)
         
         # Final summary only
         if documents:
             logger.info(f"📄 Documents loaded: {len(documents)} from {len(md_files)} files")
         return documents
     
-    def _validate_query(self, query: Dict) -> bool:
+    async def load_documents_async(self) -> List[str]:
+        """
+        Load documents with all Markdown files read concurrently.
+        
+        Returns:
+            List[str]: List of document contents as strings.
+        """
+        if not self.documents_path.exists():
+            logger.warning(f"Documents directory not found: {self.documents_path}")
+            return []
+        
+        md_files = list(self._iter_files(self.documents_path, ".md"))
+        if not md_files:
+            logger.warning(f"No Markdown files found in: {self.documents_path}")
+            return []
+        
+        loop = asyncio.get_running_loop()
+        executor = _get_read_executor()
+        contents = await asyncio.gather(
+            *(loop.run_in_executor(executor, self._load_document_file, md_file) for md_file in md_files)
+        )
+        documents = [content for content in contents if content]
+        
+        if documents:
+            logger.info(f"📄 Documents loaded: {len(documents)} from {len(md_files)} files")
+        return documents
+    
+    def _load_document_file(self, md_file: str) -> Optional[str]:
+        """
+        Read a single Markdown document.
+        
+        Content is reused while the file's mtime and size are unchanged.
+        
+        Args:
+            md_file (str): Document file path.
+            
+        Returns:
+            str: Stripped content, or None if empty or unreadable.
+        """
+        try:
+            st = os.stat(md_file)
+            # Zero-byte files are reported without being opened
+            content = st.st_size and self._read_document_file(md_file, st.st_mtime_ns, st.st_size)
+            
+            if content:
+                # Only debug log individual documents
+                logger.debug(f"Loaded document: {os.path.relpath(md_file, self.documents_path)}")
+                return content
+            logger.warning(f"Empty document: {md_file}")
+            
+        except Exception as e:
+            logger.error(f"Error loading document {md_file}: {e}")
+        return None
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _read_document_file(md_file: str, mtime_ns: int, size: int) -> str:
+        """
+        Read and strip a document (cached by path, mtime and size).
+        
+        Returns:
+            str: Stripped content.
+        """
+        fd = os.open(md_file, os.O_RDONLY)
+        try:
+            if size > MMAP_THRESHOLD_BYTES:
+                # Large documents are decoded straight from the page cache, skipping the bytes copy
+                with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                    if hasattr(mm, "madvise"):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    return str(mm, 'utf-8').strip()
+            # One exactly-sized read, bypassing the buffered text I/O layer
+            data = os.read(fd, size)
+        finally:
+            os.close(fd)
+        return data.decode('utf-8').strip()
+    
+    @staticmethod
+    def _validate_query(query: Dict) -> bool:
         """
         Validate that a query dictionary has the required fields.
         
@@ -133,16 +333,17 @@ class TrainingDataLoader:
         Returns:
             bool: True if valid, False otherwise.
         """
-        required_fields = ['question', 'sql']
-        
-        if not isinstance(query, dict):
+        if type(query) is not dict:
             return False
         
-        for field in required_fields:
-            if field not in query or not isinstance(query[field], str) or not query[field].strip():
-                return False
-        
-        return True
+        # Both fields must be non-blank strings
+        question = query.get('question')
+        sql = query.get('sql')
+        return (
+            type(question) is str and type(sql) is str
+            and not question.isspace() and not sql.isspace()
+            and bool(question) and bool(sql)
+        )
     
     def get_training_summary(self) -> Dict:
         """
@@ -163,20 +364,24 @@ class TrainingDataLoader:
             }
         }
         
-        # Count sample query files
+        # Count sample query files, dispatching each parse as soon as the file is found
+        query_futures = []
         if self.sample_queries_path.exists():
-            json_files = list(self.sample_queries_path.glob("*.json"))
-            summary['sample_queries']['total_files'] = len(json_files)
-            summary['sample_queries']['files'] = [f.name for f in json_files]
-            
-            # Count total queries
-            queries = self.load_sample_queries()
-            summary['sample_queries']['total_queries'] = len(queries)
+            executor = _get_read_executor()
+            for json_file in self._iter_files(self.sample_queries_path, ".json", recursive=False):
+                summary['sample_queries']['files'].append(os.path.basename(json_file))
+                query_futures.append(executor.submit(self._load_query_file, json_file))
+            summary['sample_queries']['total_files'] = len(query_futures)
         
-        # Count document files
+        # Count document files while the query files are parsed in the background
         if self.documents_path.exists():
-            md_files = list(self.documents_path.rglob("*.md"))
+            md_files = list(self._iter_files(self.documents_path, ".md"))
             summary['documents']['total_files'] = len(md_files)
-            summary['documents']['files'] = [str(f.relative_to(self.documents_path)) for f in md_files]
+            summary['documents']['files'] = [os.path.relpath(f, self.documents_path) for f in md_files]
+        
+        # Count from the cached per-file tuples without building a combined list
+        summary['sample_queries']['total_queries'] = sum(
+            len(future.result()) for future in query_futures
+        )
         
         return summary 
\ No newline at end of file
@@ -3,17 +3,44 @@ Application helper functions with caching for the Streamlit interface.
 This module acts as an intermediary between the Streamlit UI and the Vanna Agent,
 and includes UI-specific data processing and generation logic.
 """
-import pandas as pd
 import streamlit as st
-import traceback
 import logging
-import hashlib
-import json
+import itertools
+import re
+import time
+import uuid
+from typing import TYPE_CHECKING
 
-from agent.vanna_agent import VannaAgent
+import orjson
+
+# pandas, the agent and the connector are imported where used, so importing the
+# lightweight helpers (e.g. is_sql_valid_cached) does not pull in the heavy stack
+if TYPE_CHECKING:
+    import pandas as pd
+    from database.connector import PostgreSQLConnector
 
 logger = logging.getLogger(__name__)
 
+# Prefixes of error/apology messages returned in place of SQL (anchored, so only the start is scanned)
+_ERROR_MESSAGE_PREFIX = re.compile(r"(?:the |sorry|error|unable|failed|cannot)", re.IGNORECASE)
+
+# Seconds a session waits before retrying a failed agent initialization
+AGENT_INIT_RETRY_SECONDS = 60
+
+# Session-state marker for a failed agent initialization
+_AGENT_INIT_FAILED = object()
+
+# Shared database connector
+@st.cache_resource(show_spinner=False)
+def get_db_connector() -> "PostgreSQLConnector":
+    """
+    Gets the process-wide database connector.
+    Sessions keep separate agents, but all of them borrow from one connection pool
+    instead of each opening its own.
+    """
+    from database.connector import PostgreSQLConnector
+    return PostgreSQLConnector()
+
 # Initialize Vanna Agent
 def get_vanna_agent():
     """
@@ -24,12 +51,20 @@ def get_vanna_agent():
     if "vanna_agent" not in st.session_state:
         st.session_state.vanna_agent = None
     
+    # A recent failed initialization is not retried until the retry interval has passed
+    if st.session_state.vanna_agent is _AGENT_INIT_FAILED:
+        if time.monotonic() - st.session_state.vanna_agent_failed_at < AGENT_INIT_RETRY_SECONDS:
+            return None
+        st.session_state.vanna_agent = None
+    
     # Return existing agent if already initialized for this session
     if st.session_state.vanna_agent is not None:
         return st.session_state.vanna_agent
     
     # Initialize new agent for this session
-    agent = VannaAgent()
+    from agent.vanna_agent import VannaAgent
+    session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+    agent = VannaAgent(db_connector=get_db_connector(), session_id=session_id)
     if not agent.initialized:
         logger.info("VannaAgent not initialized, attempting to initialize...")
         success = agent.initialize()
@@ -38,6 +73,8 @@ def get_vanna_agent():
         else:
             logger.error("Failed to initialize VannaAgent.")
             st.error("Core AI agent initialization failed. Please check logs and configuration.")
+            st.session_state.vanna_agent = _AGENT_INIT_FAILED
+            st.session_state.vanna_agent_failed_at = time.monotonic()
             return None
     
     # Store in session state for this user
@@ -45,33 +82,33 @@ def get_vanna_agent():
     logger.info(f"Created new VannaAgent instance for session: {st.session_state.get('session_id', 'unknown')}")
     return agent
 
+# Suggested questions with progressive difficulty (a constant, built once at import)
+_SUGGESTED_QUESTIONS = (
+    # Level 1: Database exploration
+    "What tables are available in this database?",
+    
+    # Level 2: Data overview
+    "Show me the row count for each table in the database",
+    
+    # Level 3: Data freshness check
+    "For each table, show me the most recent record date if there are any date/timestamp columns",
+    
+    # Level 4: Basic data analysis
+    "Show me the top 10 records from the largest table by row count",
+    
+    # Level 5: Schema exploration
+    "What are the column names and data types for all tables in the database?"
+)
+
 # Generate suggested questions
-@st.cache_data(ttl=3600, show_spinner=False)
-@st.cache_data(ttl=3600)
 def generate_questions_cached():
     """
     Generates a list of suggested questions with progressive difficulty.
     
     Returns:
-        list: Five suggested questions from basic to advanced level
+        tuple: Five suggested questions from basic to advanced level
     """
-    questions = [
-        # Level 1: Database exploration
-        "What tables are available in this database?",
-        
-        # Level 2: Data overview
-        "Show me the row count for each table in the database",
-        
-        # Level 3: Data freshness check
-        "For each table, show me the most recent record date if there are any date/timestamp columns",
-        
-        # Level 4: Basic data analysis
-        "Show me the top 10 records from the largest table by row count",
-        
-        # Level 5: Schema exploration
-        "What are the column names and data types for all tables in the database?"
-    ]
-    return questions
+    return _SUGGESTED_QUESTIONS
 
 # Generate SQL query
 def generate_sql_cached(question: str, use_conversation_context: bool = True):
@@ -109,7 +146,7 @@ def generate_sql_cached(question: str, use_conversation_context: bool = True):
         return sql_query
 
     except Exception as e:
-        logger.error(f"Error generating SQL: {e}\n{traceback.format_exc()}")
+        logger.exception("Error generating SQL: %s", e)
         return f"Unexpected error occurred while generating SQL: {e}"
 
 # Validate SQL
@@ -119,13 +156,10 @@ def is_sql_valid_cached(sql: str) -> bool:
     if not isinstance(sql, str) or not sql.strip():
         return False
     # Check for error messages instead of SQL
-    error_indicators = ["the ", "sorry", "error", "unable", "failed", "cannot"]
-    if any(sql.lower().startswith(indicator) for indicator in error_indicators):
-        return False
-    return True
+    return _ERROR_MESSAGE_PREFIX.match(sql) is None
 
 # Run SQL query (no caching due to JSONB columns)
-def run_sql_cached(sql: str) -> pd.DataFrame | None:
+def run_sql_cached(sql: str) -> "pd.DataFrame | None":
     """Executes SQL query and returns results as a DataFrame."""
     try:
         agent = get_vanna_agent()
@@ -133,28 +167,33 @@ def run_sql_cached(sql: str) -> pd.DataFrame | None:
             logger.error("Vanna agent or DB connector not available for executing SQL.")
             return None
         
-        db_connector = agent.db_connector
-        
-        if not db_connector.connection or db_connector.connection.closed:
-            logger.info("DB connection closed, attempting to reconnect.")
-            if not db_connector.connect():
-                logger.error("Failed to reconnect to the database.")
-                return None
-            
-        logger.info(f"Executing SQL: {sql}")
-        df = db_connector.execute_query(sql)
-        
+        logger.info("Executing SQL: %s", sql)
+        # execute_query opens the pool if needed, and the pool health-checks connections on checkout
+        # Generated SQL is a validated SELECT, so it can stream through a server-side cursor
+        df = agent.db_connector.execute_query(
+            sql, chunksize=agent.RESULT_FETCH_CHUNK_SIZE, max_rows=agent.MAX_RESULT_ROWS,
+            json_as_text=True
+        )
+        # JSONB is requested as text above; this guards any dict values that remain
         # Convert JSONB/dict columns to strings to avoid caching issues
         if df is not None and not df.empty:
-            for col in df.columns:
-                if df[col].dtype == 'object':
-                    # Check if any values in this column are dicts
-                    sample_vals = df[col].dropna().head(3)
-                    if not sample_vals.empty and any(isinstance(val, dict) for val in sample_vals):
-                        logger.info(f"Converting JSONB column '{col}' to string for caching compatibility")
-                        df[col] = df[col].apply(lambda x: json.dumps(x, ensure_ascii=False) if isinstance(x, dict) else x)
+            # Only object columns can hold dicts; read dtypes once instead of slicing every column
+            object_positions = [
+                position for position, dtype in enumerate(df.dtypes) if dtype == object
+            ]
+            # Positional access handles duplicate column names; values are scanned as plain lists
+            for position in object_positions:
+                values = df.iloc[:, position].tolist()
+                # Check if any of the first non-null values in this column are dicts
+                sample_vals = itertools.islice((val for val in values if val is not None), 3)
+                if any(type(val) is dict for val in sample_vals):
+                    logger.info("Converting JSONB column '%s' to string for caching compatibility", df.columns[position])
+                    df.isetitem(position, [
+                        orjson.dumps(val, default=str).decode() if type(val) is dict else val
+                        for val in values
+                    ])
         
         return df
     except Exception as e:
-        logger.error(f"Error executing SQL: {e}\n{traceback.format_exc()}")
+        logger.exception("Error executing SQL: %s", e)
         return None 
\ No newline at end of file
@@ -5,6 +5,13 @@ Refactored to follow Streamlit best practices for session state and chat interfa
 import sys
 import os
 import time
+import atexit
+import gzip
+import pickle
+import shutil
+import tempfile
+import uuid
+from collections import OrderedDict
 import streamlit as st
 import pandas as pd
 import logging
@@ -46,6 +53,28 @@ from ui.app_helpers import (
 # Vanna AI Avatar URL
 AVATAR_URL = "https://vanna.ai/img/vanna.svg"
 
+# Rows of each result kept in conversation history (only a preview is ever displayed)
+HISTORY_SAMPLE_ROWS = int(os.getenv("HISTORY_SAMPLE_ROWS", "250"))
+
+# Heading above the suggested questions (only shown before the first question)
+SUGGESTIONS_HEADING_HTML = (
+    "<h4 style='margin-bottom: 0.5rem; color: #1f77b4; font-weight: 600;'>"
+    "💡 Get started with these questions</h4>"
+)
+
+# Rows of a result preview sent to the browser at a time
+RESULTS_PAGE_SIZE = int(os.getenv("RESULTS_PAGE_SIZE", "50"))
+
+# Saved conversations kept per session; the least recently saved are dropped beyond this
+MAX_SAVED_CONVERSATIONS = int(os.getenv("MAX_SAVED_CONVERSATIONS", "50"))
+
+# Live history entries beyond which the oldest turns are moved into a compressed archive
+HISTORY_ARCHIVE_THRESHOLD = int(os.getenv("HISTORY_ARCHIVE_THRESHOLD", "200"))
+HISTORY_ARCHIVE_BATCH = HISTORY_ARCHIVE_THRESHOLD // 2
+
+# Most recent questions rendered on each rerun; older ones are paged in on demand
+MAX_VISIBLE_TURNS = int(os.getenv("MAX_VISIBLE_TURNS", "20"))
+
 def check_authentication():
     """
     Check POC access authentication.
@@ -94,13 +123,19 @@ def initialize_session_state():
     if "conversation_history_ui" not in st.session_state:
         st.session_state.conversation_history_ui = []
     if "saved_conversations" not in st.session_state:
-        st.session_state.saved_conversations = {}
+        # Kept in most-recently-saved-first order, so the sidebar never has to sort
+        st.session_state.saved_conversations = OrderedDict()
     if "conversation_counter" not in st.session_state:
         st.session_state.conversation_counter = 0
     if "editing_conversation" not in st.session_state:
         st.session_state.editing_conversation = None
     if "current_loaded_conversation_id" not in st.session_state:
         st.session_state.current_loaded_conversation_id = None
+    if "visible_turns" not in st.session_state:
+        st.session_state.visible_turns = MAX_VISIBLE_TURNS
+    if "history_archive" not in st.session_state:
+        # (turn count, gzip-compressed pickle) blocks of the current conversation's oldest turns
+        st.session_state.history_archive = []
 
 def add_to_ui_history(role: str, content: str, metadata: dict = None):
     """Add message to UI conversation history."""
@@ -112,80 +147,249 @@ def add_to_ui_history(role: str, content: str, metadata: dict = None):
     }
     st.session_state.conversation_history_ui.append(entry)
 
-def display_conversation_history():
-    """Display all conversation history with user messages as chat and agent responses as expandable sections."""
-    if not st.session_state.conversation_history_ui:
+def archive_old_turns():
+    """Move the oldest turns out of the live history into a compressed archive once it grows too long."""
+    history = st.session_state.conversation_history_ui
+    if len(history) <= HISTORY_ARCHIVE_THRESHOLD:
         return
+    # Cut at a user message so a question is never separated from its answer
+    cut = next(
+        (i for i in range(HISTORY_ARCHIVE_BATCH, len(history)) if history[i]["role"] == "user"),
+        None
+    )
+    if cut is None:
+        return
+    archived = history[:cut]
+    turns = sum(1 for entry in archived if entry["role"] == "user")
+    st.session_state.history_archive.append(
+        (turns, gzip.compress(pickle.dumps(archived, protocol=pickle.HIGHEST_PROTOCOL)))
+    )
+    # In place, so a saved conversation sharing this list keeps the same live window
+    del history[:cut]
+    # Item positions in the cached render plan no longer match the list
+    st.session_state.pop("render_plan", None)
+    logger.info(f"Archived {turns} older turns of the current conversation")
+
+def new_render_plan(history: list) -> dict:
+    """Create an empty render plan for a history list."""
+    return {
+        "history": history,
+        "parsed": 0,
+        "items": [],
+        "user_items": [],
+        "pending_sql": None,
+        "latest_results": None
+    }
+
+def get_render_plan(history: list) -> dict:
+    """
+    Gets the render plan for the conversation history, parsing only entries added since the last rerun.
     
-    # Track current question and responses
-    current_question = None
-    current_sql = None
-    current_results = None
-    first_message = True
-    
-    for entry in st.session_state.conversation_history_ui:
+    The plan is a flat list of ("user", text), ("results", sql, entry) and ("error", message) items
+    plus the positions of user items, cached in session state and rebuilt when the history list changes.
+    """
+    plan = st.session_state.get("render_plan")
+    if plan is None or plan["history"] is not history:
+        plan = new_render_plan(history)
+        st.session_state.render_plan = plan
+    extend_render_plan(plan)
+    return plan
+
+def extend_render_plan(plan: dict):
+    """Parse the history entries the plan has not seen yet."""
+    history = plan["history"]
+    for entry in history[plan["parsed"]:]:
         role = entry["role"]
         content = entry["content"]
         metadata = entry.get("metadata", {})
         
         if role == "user":
+            plan["user_items"].append(len(plan["items"]))
+            plan["items"].append(("user", content))
+            plan["pending_sql"] = None
+        elif role == "assistant":
+            if "sql" in metadata:
+                plan["pending_sql"] = metadata["sql"]
+            elif metadata.get("df_results_data") is not None:
+                plan["items"].append(("results", plan["pending_sql"], entry))
+                plan["latest_results"] = entry
+                plan["pending_sql"] = None
+            elif "❌ Error:" in content:
+                plan["items"].append(("error", content.replace("❌ Error: ", "")))
+    plan["parsed"] = len(history)
+
+@st.fragment
+def display_conversation_history():
+    """
+    Display all conversation history with user messages as chat and agent responses as expandable sections.
+    Runs as a fragment, so result toggles and paging rerun only the chat history.
+    """
+    history = st.session_state.conversation_history_ui
+    if not history:
+        return
+    plan = get_render_plan(history)
+    items = plan["items"]
+    
+    # Render only the most recent questions; each rerun re-sends every widget to the browser
+    hidden_turns = len(plan["user_items"]) - st.session_state.visible_turns
+    start = 0
+    if hidden_turns > 0:
+        start = plan["user_items"][hidden_turns]
+        if st.button(f"⬆️ Show earlier messages ({hidden_turns} hidden)", key="show_earlier_btn"):
+            st.session_state.visible_turns += MAX_VISIBLE_TURNS
+            st.rerun(scope="fragment")
+    elif st.session_state.history_archive:
+        archive = st.session_state.history_archive
+        archived_turns = sum(turns for turns, _ in archive)
+        # Archived turns are only decompressed while this toggle is on
+        if st.toggle(f"🗄️ View archived turns ({archived_turns})", key="show_archived_turns"):
+            for _, blob in archive:
+                archived_plan = new_render_plan(pickle.loads(gzip.decompress(blob)))
+                extend_render_plan(archived_plan)
+                render_plan_items(archived_plan["items"], None)
+            st.markdown("---")
+    
+    # Only the latest result table is rendered eagerly; older ones are serialized on request
+    render_plan_items(items[start:], plan["latest_results"])
+
+def render_plan_items(items: list, latest_results: dict):
+    """Render a slice of render-plan items."""
+    first_message = True
+    
+    for item in items:
+        if item[0] == "user":
             # Add separator before user question (except for the first message)
             if not first_message:
                 st.markdown("---")
             
-            # Display user question with original chat_message style
+            # Each question gets its own bubble, even when the previous one rendered no answer
             with st.chat_message("user"):
-                st.write(content)
-            current_question = content
-            current_sql = None
-            current_results = None
+                st.markdown(item[1])
             first_message = False
-            
-        elif role == "assistant":
-            if "sql" in metadata:
-                current_sql = metadata["sql"]
-            elif metadata.get("df_results_data") is not None:
-                current_results = metadata
-                
-                # Now display agent response with separate expanders
-                st.markdown("---")  # Visual separator
-                
-                # SQL Expander
-                if current_sql:
-                    with st.expander("🔍 **Generated SQL Query**", expanded=False):
-                        st.code(current_sql, language="sql", line_numbers=True)
-                
-                # Results Expander
-                df_data = current_results.get("df_results_data")
-                if df_data and len(df_data) > 0:
-                    df = pd.DataFrame(df_data)
-                    rows_text = "row" if len(df) == 1 else "rows"
-                    with st.expander(f"📊 **Query Results** ({len(df)} {rows_text})", expanded=True):
-                        st.caption(f"Showing first {min(len(df), 250)} rows")
-                        st.dataframe(df.head(min(len(df), 250)), use_container_width=True)
+        else:
+            render_response_item(item, latest_results)
+
+def render_response_item(item: tuple, latest_results: dict):
+    """Render a results or error item of the render plan."""
+    kind = item[0]
+    if kind == "results":
+        _, current_sql, entry = item
+        current_results = entry["metadata"]
+        
+        # Now display agent response with separate expanders
+        st.markdown("---")  # Visual separator
+        
+        # SQL Expander
+        if current_sql:
+            with st.expander("🔍 **Generated SQL Query**", expanded=False):
+                st.code(current_sql, language="sql", line_numbers=True)
+        
+        # Results Expander
+        # Stored as a DataFrame preview, so reruns display it without rebuilding
+        # Row counts are recorded when the result is stored, so rendering never measures the frame
+        df = current_results.get("df_results_data")
+        preview_rows = current_results.get("preview_rows", 0)
+        if df is not None and preview_rows > 0:
+            total_rows = current_results["rows_count"]
+            rows_text = "row" if total_rows == 1 else "rows"
+            is_latest = entry is latest_results
+            with st.expander(f"📊 **Query Results** ({total_rows} {rows_text})", expanded=is_latest):
+                # Expander bodies run even when collapsed, so gate the table itself
+                if is_latest or st.toggle("Show table", key=f"show_results_{entry['timestamp']}"):
+                    st.caption(f"Showing first {preview_rows} rows")
+                    render_preview_page(df, preview_rows, entry["timestamp"])
                 else:
-                    with st.expander("📊 **Query Results**", expanded=True):
-                        st.info("✅ Query executed successfully, no data returned")
-                
-                # Reset for next Q&A
-                current_sql = None
-                current_results = None
-                
-            elif "❌ Error:" in content:
-                # Handle error case
-                st.markdown("---")  # Visual separator
-                st.error(content.replace("❌ Error: ", ""))
+                    st.caption(f"{preview_rows} preview rows available")
+        else:
+            with st.expander("📊 **Query Results**", expanded=True):
+                st.info("✅ Query executed successfully, no data returned")
+        
+    elif kind == "error":
+        # Handle error case
+        st.markdown("---")  # Visual separator
+        st.error(item[1])
+
+def render_preview_page(df: pd.DataFrame, preview_rows: int, entry_key) -> None:
+    """Render one page of a result preview, so only that page is serialized to the browser."""
+    if preview_rows <= RESULTS_PAGE_SIZE:
+        st.dataframe(df, use_container_width=True)
+        return
+    
+    page_key = f"results_page_{entry_key}"
+    last_page = (preview_rows - 1) // RESULTS_PAGE_SIZE
+    page = min(st.session_state.get(page_key, 0), last_page)
+    start = page * RESULTS_PAGE_SIZE
+    st.dataframe(df.iloc[start:start + RESULTS_PAGE_SIZE], use_container_width=True)
+    
+    col1, col2, col3 = st.columns([1, 3, 1])
+    with col1:
+        if st.button("◀ Prev", key=f"{page_key}_prev", disabled=page == 0, use_container_width=True):
+            st.session_state[page_key] = page - 1
+            st.rerun(scope="fragment")
+    with col2:
+        st.caption(f"Rows {start + 1}-{min(start + RESULTS_PAGE_SIZE, preview_rows)} of {preview_rows}")
+    with col3:
+        if st.button("Next ▶", key=f"{page_key}_next", disabled=page == last_page, use_container_width=True):
+            st.session_state[page_key] = page + 1
+            st.rerun(scope="fragment")
+
+@st.cache_resource(show_spinner=False)
+def get_conversation_spill_dir() -> str:
+    """
+    Gets the private directory where inactive conversations are kept on disk.
+    Created once per process (mode 0700) and removed at exit.
+    """
+    spill_dir = tempfile.mkdtemp(prefix="chatalyst_conversations_")
+    atexit.register(shutil.rmtree, spill_dir, ignore_errors=True)
+    return spill_dir
+
+def spill_conversation(conversation_id: str):
+    """Move a saved conversation's history and archive to disk so only the active one stays in session memory."""
+    conversation = st.session_state.saved_conversations.get(conversation_id)
+    if not conversation or conversation.get("history") is None:
+        return
+    session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+    path = os.path.join(get_conversation_spill_dir(), f"{session_id}_{conversation_id}.pkl")
+    try:
+        with open(path, "wb") as f:
+            pickle.dump(
+                (conversation["history"], conversation.get("archive") or []),
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+    except Exception as e:
+        logger.warning(f"Could not move conversation {conversation_id} to disk: {e}")
+        return
+    conversation["history"] = None
+    conversation["archive"] = None
+    conversation["history_path"] = path
+
+def get_saved_history(conversation_id: str) -> list:
+    """Get a saved conversation's history, reading it (and its archive) back from disk if it was spilled."""
+    conversation = st.session_state.saved_conversations[conversation_id]
+    if conversation.get("history") is None:
+        path = conversation.pop("history_path")
+        with open(path, "rb") as f:
+            conversation["history"], conversation["archive"] = pickle.load(f)
+        os.remove(path)
+    return conversation["history"]
 
 def auto_save_current_conversation():
     """Auto-save current conversation if it has content."""
-    if st.session_state.conversation_history_ui and len(st.session_state.conversation_history_ui) > 0:
+    history = st.session_state.conversation_history_ui
+    if history:
+        saved = st.session_state.saved_conversations
+        conv_id = st.session_state.current_loaded_conversation_id
         # Check if this is an existing loaded conversation
-        if st.session_state.current_loaded_conversation_id and st.session_state.current_loaded_conversation_id in st.session_state.saved_conversations:
+        if conv_id and conv_id in saved:
             # Update existing conversation
-            conv_id = st.session_state.current_loaded_conversation_id
-            st.session_state.saved_conversations[conv_id]["history"] = st.session_state.conversation_history_ui.copy()
-            st.session_state.saved_conversations[conv_id]["timestamp"] = time.time()
-            logger.info(f"Updated existing conversation: {st.session_state.saved_conversations[conv_id]['name']}")
+            conversation = saved[conv_id]
+            # The UI history is only ever appended to or replaced, so the saved entry can share the list
+            conversation["history"] = history
+            conversation["archive"] = st.session_state.history_archive
+            conversation["timestamp"] = time.time()
+            saved.move_to_end(conv_id, last=False)
+            logger.info(f"Updated existing conversation: {conversation['name']}")
         else:
             # Create new conversation
             conv_id = f"conv_{int(time.time())}"
@@ -195,28 +399,38 @@ def auto_save_current_conversation():
             conversation_name = f"Conversation {st.session_state.conversation_counter}"
             
             # Save new conversation
-            st.session_state.saved_conversations[conv_id] = {
-                "history": st.session_state.conversation_history_ui.copy(),
+            saved[conv_id] = {
+                "history": history,
+                "archive": st.session_state.history_archive,
                 "name": conversation_name,
                 "timestamp": time.time()
             }
+            saved.move_to_end(conv_id, last=False)
             # Set this as current loaded conversation
             st.session_state.current_loaded_conversation_id = conv_id
+            
+            # Drop the least recently saved conversations beyond the cap
+            while len(saved) > MAX_SAVED_CONVERSATIONS:
+                delete_conversation(next(reversed(saved)))
             logger.info(f"Auto-saved new conversation: {conversation_name}")
 
-def load_conversation(conversation_id: str):
+def load_conversation(conversation_id: str, agent):
     """Load a saved conversation - using callback approach."""
     if conversation_id in st.session_state.saved_conversations:
-        st.session_state.conversation_history_ui = st.session_state.saved_conversations[conversation_id]["history"].copy()
+        # The conversation being left is moved to disk
+        if st.session_state.current_loaded_conversation_id != conversation_id:
+            spill_conversation(st.session_state.current_loaded_conversation_id)
+        # Shared with the saved entry; new turns are appended to both at once
+        st.session_state.conversation_history_ui = get_saved_history(conversation_id)
+        st.session_state.history_archive = st.session_state.saved_conversations[conversation_id].setdefault("archive", [])
         st.session_state.current_loaded_conversation_id = conversation_id
+        st.session_state.visible_turns = MAX_VISIBLE_TURNS
         
-        # Also load conversation to agent
-        agent = get_vanna_agent()
+        # Also load conversation to agent, replacing its history in one step
         if agent:
-            agent.clear_conversation()
             # Rebuild agent's conversation history from UI history
+            entries = []
             current_question = None
-            current_sql = None
             
             for entry in st.session_state.conversation_history_ui:
                 if entry["role"] == "user":
@@ -224,28 +438,30 @@ def load_conversation(conversation_id: str):
                 elif entry["role"] == "assistant" and current_question:
                     metadata = entry.get("metadata", {})
                     if "sql" in metadata:
-                        current_sql = metadata["sql"]
-                        agent._add_to_conversation_history({
+                        entries.append({
                             "type": "question",
                             "original_question": current_question,
                             "processed_question": current_question,
-                            "sql": current_sql,
+                            "sql": metadata["sql"],
                             "context_used": False
                         })
                         current_question = None
-                        current_sql = None
+            
+            agent.set_conversation_history(entries)
 
-def start_new_conversation():
+def start_new_conversation(agent):
     """Start a new conversation - using callback approach."""
-    # Auto-save current conversation if it has content
+    # Auto-save current conversation if it has content, then move it to disk
     auto_save_current_conversation()
+    spill_conversation(st.session_state.current_loaded_conversation_id)
     
     # Clear current conversation
     st.session_state.conversation_history_ui = []
+    st.session_state.history_archive = []
     st.session_state.current_loaded_conversation_id = None
+    st.session_state.visible_turns = MAX_VISIBLE_TURNS
     
     # Clear agent's conversation history
-    agent = get_vanna_agent()
     if agent:
         agent.clear_conversation()
     
@@ -254,7 +470,12 @@ def start_new_conversation():
 def delete_conversation(conversation_id: str):
     """Delete a saved conversation - using callback approach."""
     if conversation_id in st.session_state.saved_conversations:
-        del st.session_state.saved_conversations[conversation_id]
+        conversation = st.session_state.saved_conversations.pop(conversation_id)
+        if conversation.get("history_path"):
+            try:
+                os.remove(conversation["history_path"])
+            except OSError:
+                pass
         logger.info(f"Deleted conversation: {conversation_id}")
 
 def rename_conversation(conversation_id: str, new_name: str):
@@ -266,22 +487,34 @@ def rename_conversation(conversation_id: str, new_name: str):
         return True
     return False
 
-def clear_conversation():
+def clear_conversation(agent):
     """Clear conversation history in both UI and agent - using callback approach."""
+    spill_conversation(st.session_state.current_loaded_conversation_id)
     st.session_state.conversation_history_ui = []
+    st.session_state.history_archive = []
     st.session_state.current_loaded_conversation_id = None
+    st.session_state.visible_turns = MAX_VISIBLE_TURNS
     # Clear agent's conversation history
-    agent = get_vanna_agent()
     if agent:
         agent.clear_conversation()
     logger.info("Conversation cleared by user")
 
+def queue_suggested_question():
+    """Queue the picked suggestion for processing and reset the selection (pills on_change callback)."""
+    question = st.session_state.suggested_question
+    st.session_state.suggested_question = None
+    if question:
+        st.session_state["pending_question"] = question
+
 def has_active_conversation():
     """Check if there's an active conversation."""
-    return len(st.session_state.conversation_history_ui) > 0
+    return bool(st.session_state.conversation_history_ui)
 
 def process_question(question: str):
-    """Process a user question and update conversation history."""
+    """
+    Process a user question and update conversation history.
+    Called before anything is rendered, so the same run displays the new turn without a forced rerun.
+    """
     # Add user question to UI history
     add_to_ui_history("user", question)
     
@@ -294,7 +527,6 @@ def process_question(question: str):
             add_to_ui_history("assistant", f"❌ Error: {error_msg}")
             # Auto-save conversation after adding error
             auto_save_current_conversation()
-            st.rerun()  # Force UI update to show error
             return
         
         sql_query = sql_query_or_error
@@ -310,81 +542,47 @@ def process_question(question: str):
         add_to_ui_history("assistant", f"❌ Error: {error_msg}")
         # Auto-save conversation after adding error
         auto_save_current_conversation()
-        st.rerun()  # Force UI update to show error
         return
     
     # Store dataframe in session state
     st.session_state["df_results"] = df_results
 
     # Add results to UI history with actual DataFrame data
-    results_summary = f"Query executed successfully. {len(df_results)} rows returned."
+    rows_count = len(df_results)
+    results_summary = f"Query executed successfully. {rows_count} rows returned."
+    if df_results.attrs.get("truncated"):
+        results_summary += " Results were truncated at the row limit; add filters or a LIMIT to narrow the query."
     df_data_for_history = None
     if not df_results.empty:
-        # Store only first 1000 rows to avoid memory issues
-        df_for_storage = df_results.head(1000)
-        df_data_for_history = df_for_storage.to_dict('records')
+        # Store only a preview; the full frame stays in st.session_state["df_results"]
+        # Kept as a DataFrame so reruns render it directly instead of rebuilding from records;
+        # copied so the preview owns compact column arrays instead of pinning the full result
+        df_data_for_history = df_results.head(HISTORY_SAMPLE_ROWS).copy()
     
     add_to_ui_history("assistant", results_summary, {
-        "rows_count": len(df_results), 
+        "rows_count": rows_count,
+        "preview_rows": min(rows_count, HISTORY_SAMPLE_ROWS),
         "df_results_data": df_data_for_history
     })
     
     # Auto-save conversation after successful completion
     auto_save_current_conversation()
-    
-    # Force UI update to show all the new conversation content
-    st.rerun()
 
-def main():
-    """Main function to run the Streamlit application."""
-    st.set_page_config(
-        page_title="Chatalyst AI - Data Query Assistant",
-        page_icon="📊",
-        layout="wide"
-    )
-
-    # POC Authentication Check
-    check_authentication()
-
-    # Initialize session state
-    initialize_session_state()
-
-    # Initialize Vanna Agent early
-    if not get_vanna_agent():
-        st.error("AI Agent could not be initialized. Please check the logs and configuration.")
-
-    # Sidebar - Conversation management
-    st.sidebar.title("💬 Chat Management")
-    
-    # New conversation button
-    if st.sidebar.button("➕ New Chat", use_container_width=True, type="primary", key="new_conv_btn"):
-        start_new_conversation()
-        st.rerun()
-    
-    # Clear current conversation (only show if active)
-    if has_active_conversation():
-        if st.sidebar.button("🗑️ Clear Current", use_container_width=True, key="clear_conv_btn"):
-            clear_conversation()
-            st.rerun()
-    
-    st.sidebar.markdown("---")
-    
-    # Recent conversations
-    if st.session_state.saved_conversations:
-        st.sidebar.markdown("**📚 Recent Chats**")
+@st.fragment
+def render_conversation_list(agent):
+    """Render the saved conversation list in the sidebar; its buttons rerun only this fragment except loading."""
+    # Read session state once; the loop below only uses locals
+    saved = st.session_state.saved_conversations
+    editing = st.session_state.editing_conversation
+    if saved:
+        st.markdown("**📚 Recent Chats**")
         
-        # Sort conversations by timestamp (newest first)
-        sorted_conversations = sorted(
-            st.session_state.saved_conversations.items(),
-            key=lambda x: x[1]["timestamp"],
-            reverse=True
-        )
-        
-        for conv_id, conv_data in sorted_conversations:
+        # Already ordered newest first
+        for conv_id, conv_data in saved.items():
             # Check if this conversation is being edited
-            if st.session_state.editing_conversation == conv_id:
+            if editing == conv_id:
                 # Edit mode: show text input and confirm/cancel buttons
-                col1, col2, col3 = st.sidebar.columns([3, 1, 1])
+                col1, col2, col3 = st.columns([3, 1, 1])
                 
                 with col1:
                     new_name = st.text_input(
@@ -398,15 +596,15 @@ def main():
                     if st.button("✓", key=f"confirm_{conv_id}", help="Save changes"):
                         if rename_conversation(conv_id, new_name):
                             st.session_state.editing_conversation = None
-                            st.rerun()
+                            st.rerun(scope="fragment")
                 
                 with col3:
                     if st.button("✗", key=f"cancel_{conv_id}", help="Cancel editing"):
                         st.session_state.editing_conversation = None
-                        st.rerun()
+                        st.rerun(scope="fragment")
             else:
                 # Normal mode: show conversation name, edit and delete buttons
-                col1, col2, col3 = st.sidebar.columns([3, 1, 1])
+                col1, col2, col3 = st.columns([3, 1, 1])
                 
                 with col1:
                     if st.button(
@@ -415,21 +613,68 @@ def main():
                         key=f"load_{conv_id}",
                         help="Click to load this conversation"
                     ):
-                        load_conversation(conv_id)
+                        load_conversation(conv_id, agent)
+                        # Loading changes the main chat, so rerun the whole app
                         st.rerun()
                 
                 with col2:
                     if st.button("📝", key=f"edit_{conv_id}", help="Rename conversation"):
                         st.session_state.editing_conversation = conv_id
-                        st.rerun()
+                        st.rerun(scope="fragment")
                         
                 with col3:
                     if st.button("🗑️", key=f"delete_{conv_id}", help="Delete conversation"):
                         delete_conversation(conv_id)
-                        st.rerun()
+                        st.rerun(scope="fragment")
+
+def main():
+    """Main function to run the Streamlit application."""
+    st.set_page_config(
+        page_title="Chatalyst AI - Data Query Assistant",
+        page_icon="📊",
+        layout="wide"
+    )
+
+    # POC Authentication Check
+    check_authentication()
+
+    # Initialize session state
+    initialize_session_state()
+
+    # Initialize Vanna Agent early; resolved once per rerun and passed to the helpers
+    agent = get_vanna_agent()
+    if not agent:
+        st.error("AI Agent could not be initialized. Please check the logs and configuration.")
+
+    # Chat input is pinned to the bottom of the page wherever it is called; questions
+    # (typed or a queued suggestion) are processed before rendering so this run shows the new turn
+    user_input = st.chat_input("Ask me anything about your data...")
+    for question in (st.session_state.pop("pending_question", None), user_input):
+        if question:
+            process_question(question)
+            archive_old_turns()
+
+    # Sidebar - Conversation management
+    st.sidebar.title("💬 Chat Management")
+    
+    # New conversation button
+    if st.sidebar.button("➕ New Chat", use_container_width=True, type="primary", key="new_conv_btn"):
+        start_new_conversation(agent)
+        st.rerun()
+    
+    # Clear current conversation (only show if active)
+    if has_active_conversation():
+        if st.sidebar.button("🗑️ Clear Current", use_container_width=True, key="clear_conv_btn"):
+            clear_conversation(agent)
+            st.rerun()
+    
+    st.sidebar.markdown("---")
+    
+    # Recent conversations (a fragment, so list edits rerun only the sidebar list)
+    with st.sidebar:
+        render_conversation_list(agent)
     
     # Current conversation status
-    agent = get_vanna_agent()
     if agent:
         summary = agent.get_conversation_summary()
         if summary["total_questions"] > 0:
@@ -443,36 +688,18 @@ def main():
     # Display suggested questions only when no active conversation
     if not has_active_conversation():
         # Simplified header with better styling
-        st.markdown("""
-        <h4 style='margin-bottom: 0.5rem; color: #1f77b4; font-weight: 600;'>
-            💡 Get started with these questions
-        </h4>
-        """, unsafe_allow_html=True)
+        st.markdown(SUGGESTIONS_HEADING_HTML, unsafe_allow_html=True)
         
         questions = generate_questions_cached()
         if questions:
-            # Add custom CSS for left-aligned buttons that fill container width
-            st.markdown("""
-            <style>
-            .stButton > button {
-                text-align: left !important;
-                justify-content: flex-start !important;
-                padding-left: 1rem !important;
-            }
-            </style>
-            """, unsafe_allow_html=True)
-            
-            # Create buttons that fill container width but with left-aligned text
-            for i, question_text in enumerate(questions):
-                button_key = f"suggest_{i}"
-                if st.button(
-                    question_text, 
-                    key=button_key,
-                    use_container_width=True
-                ):
-                    # Use session state to track the suggested question
-                    st.session_state["pending_question"] = question_text
-                    st.rerun()
+            # One pills widget instead of a button per question; the pick is queued by its callback
+            st.pills(
+                "Suggested questions",
+                questions,
+                key="suggested_question",
+                on_change=queue_suggested_question,
+                label_visibility="collapsed"
+            )
         else:
             st.caption("No suggested questions available at the moment.")
         
@@ -480,19 +707,6 @@ def main():
     
     # Display conversation history
     display_conversation_history()
-    
-    # Process any pending suggested question
-    if "pending_question" in st.session_state:
-        pending_q = st.session_state["pending_question"]
-        del st.session_state["pending_question"]  # Remove to avoid reprocessing
-        process_question(pending_q)
-    
-    # Chat input
-    user_input = st.chat_input("Ask me anything about your data...")
-    
-    # Process user input
-    if user_input:
-        process_question(user_input)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,17 +1,78 @@
 """
 SQL validation module for Vanna AI generated queries.
 """
+import difflib
 import logging
-from typing import Tuple, Set
+import re
+import sys
+from typing import FrozenSet, Iterable, List, Optional, Tuple, Set
 
 logger = logging.getLogger(__name__)
 
+# String literals, quoted identifiers and comments; the lexers below consume
+# these as unnamed tokens so keywords inside them are never matched
+_SQL_NON_CODE = r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/"
+
+# Fast-path checks that reject obviously bad SQL before the heavier validation
+# Read-only statement start, allowing leading comments and opening parentheses
+_FAST_SQL_OK = re.compile(
+    r"^\s*(?:--[^\n]*\n\s*|/\*.*?\*/\s*)*(?:\(\s*)*(?:WITH|SELECT)\b",
+    re.IGNORECASE | re.DOTALL
+)
+# Data-modifying / DDL keywords are never allowed in generated queries (outside
+# literals and comments, so e.g. event_type = 'delete' is fine)
+_FAST_SQL_BAD = re.compile(
+    _SQL_NON_CODE + r"|(?P<write>\b(?:DROP|DELETE|UPDATE|INSERT|ALTER|TRUNCATE|GRANT)\b)",
+    re.IGNORECASE | re.DOTALL
+)
+# Statement starting with a CTE (lowercase SQL), allowing leading comments
+_CTE_START = re.compile(r"\s*(?:--[^\n]*\n\s*|/\*.*?\*/\s*)*with\b", re.DOTALL)
+# Phrases that mean the model answered with an error message instead of SQL
+_ERROR_INDICATORS = re.compile(
+    '|'.join(re.escape(indicator) for indicator in (
+        "無法根據現有資料庫結構生成此查詢",
+        "sorry", "error", "unable", "cannot", "無法", "失敗"
+    )),
+    re.IGNORECASE
+)
+# Lexer for clause keywords whose first positions bound the SELECT list and
+# ORDER BY clause; string literals, quoted identifiers and comments are consumed
+# unnamed so keywords inside them (or inside names like from_date) are skipped
+_SQL_ANCHORS = re.compile(
+    _SQL_NON_CODE +
+    r"|(?P<select>\bselect\b)|(?P<from>\bfrom\b)|(?P<order_by>\border\s+by\b)",
+    re.DOTALL
+)
+# Alias at the end of a SELECT item: "expr AS alias" or "expr alias"
+_SELECT_ALIAS = re.compile(r"(?:\bas|[\w)\]\"'])\s+([a-z_][a-z0-9_]*)\s*(?:,|$)")
+# Trailing words the alias regex can capture that are never aliases
+_NON_ALIAS_WORDS = frozenset({'as', 'distinct', 'end', 'null', 'true', 'false', 'asc', 'desc'})
+
+# Which validation path checks an invalid-column pattern
+_CHECK_DEFAULT = 1  # Plain queries (_check_column_validity)
+_CHECK_STRICT = 2   # CTE queries (_validate_cte_query)
+
 
 class SQLValidator:
     """
     Validates generated SQL queries against database schema.
     """
     
+    # One validator is created per agent (i.e. per session); slots keep each
+    # instance compact and attribute access off the instance dict
+    __slots__ = (
+        'schema_manager',
+        '_columns_source',
+        '_cached_columns_lower',
+        '_column_pairs',
+        '_invalid_patterns',
+        '_strict_invalid_patterns',
+        '_col_ref_regexes',
+        '_pattern_word_regexes',
+        '_pattern_flags',
+        '_pattern_re',
+    )
+    
     def __init__(self, schema_manager):
         """
         Initialize SQL validator.
@@ -20,7 +81,12 @@ class SQLValidator:
             schema_manager: SchemaManager instance
         """
         self.schema_manager = schema_manager
-        self._invalid_patterns = {
+        # Lowercased column names, rebuilt only when the schema manager hands
+        # back a different column set (i.e. after a schema reload)
+        self._columns_source = None
+        self._cached_columns_lower: FrozenSet[str] = frozenset()
+        self._column_pairs: Tuple[Tuple[str, str], ...] = ()  # (lowercased, original)
+        self._invalid_patterns = frozenset({
             'conversion_rate',  # Common hallucination
             'revenue',          # Often assumed but may not exist
             'clicks',           # Common assumption
@@ -32,7 +98,89 @@ class SQLValidator:
             'budget',           # Financial assumption
             'success_rate',     # Metric assumption
             'participant_count' # Count assumption
+        })
+        # For CTE queries, only check for obvious invalid patterns
+        # that are not likely to be aliases or calculated fields
+        self._strict_invalid_patterns = frozenset({
+            'clicks',           # Definitely doesn't exist
+            'impressions',      # Definitely doesn't exist
+            'ctr',             # Definitely doesn't exist
+            'roas',            # Definitely doesn't exist
+            'created_by',      # User assumption
+            'user_id',         # User assumption
+            'tags',            # Classification assumption
+            'priority',        # Ordering assumption
+            'budget',          # Financial assumption
+            'participant_count' # Count assumption
+        })
+        
+        # Column-reference regexes compiled once per pattern: table.column,
+        # WHERE/AND/OR column <op>, ON table.column =. Patterns are escaped, and
+        # qualifiers start at a word boundary inside an atomic group so long
+        # identifier runs cannot trigger backtracking
+        self._col_ref_regexes = {
+            pattern: re.compile('|'.join([
+                rf'\b(?>\w+)\.{escaped}\b',
+                rf'\b(?>where|and|or)\s+{escaped}\s*[=<>]',
+                rf'\bon\s+(?>\w+)\.{escaped}\s*=',
+            ]))
+            for pattern in self._invalid_patterns | self._strict_invalid_patterns
+            for escaped in (re.escape(pattern),)
+        }
+        # Whole-word occurrences, so 'budget' does not match inside 'campaign_budget'
+        self._pattern_word_regexes = {
+            pattern: re.compile(rf'\b{re.escape(pattern)}\b')
+            for pattern in self._invalid_patterns
+        }
+        
+        # Both pattern sets share one matcher; each pattern carries a mask of the
+        # validation paths that check it
+        self._pattern_flags = {
+            pattern: (_CHECK_DEFAULT if pattern in self._invalid_patterns else 0)
+            | (_CHECK_STRICT if pattern in self._strict_invalid_patterns else 0)
+            for pattern in self._invalid_patterns | self._strict_invalid_patterns
         }
+        # Lookahead alternation reports every (possibly overlapping) occurrence in one pass
+        alternation = '|'.join(re.escape(p) for p in sorted(self._pattern_flags, key=len, reverse=True))
+        self._pattern_re = re.compile(f'(?=({alternation}))')
+    
+    def _scan_patterns(self, sql_lower: str, mask: int) -> Set[str]:
+        """
+        Find the invalid-column patterns present in the SQL for a validation path.
+        
+        Args:
+            sql_lower: Lowercase SQL string
+            mask: _CHECK_DEFAULT or _CHECK_STRICT
+            
+        Returns:
+            set: Patterns occurring in the SQL that the path checks
+        """
+        flags = self._pattern_flags
+        return {
+            pattern for pattern in {sys.intern(m.group(1)) for m in self._pattern_re.finditer(sql_lower)}
+            if flags[pattern] & mask
+        }
+    
+    def invalidate_schema_cache(self) -> None:
+        """Drop the cached column names so the next validation re-reads the schema."""
+        self._columns_source = None
+        self._cached_columns_lower = frozenset()
+        self._column_pairs = ()
+    
+    def _columns_lower(self) -> FrozenSet[str]:
+        """
+        Get lowercased schema column names.
+        
+        Returns:
+            frozenset: Lowercased column names, cached until the schema changes
+        """
+        all_columns = self.schema_manager.get_all_column_names()
+        if all_columns is not self._columns_source:
+            # Interned so membership tests against the interned patterns hit on identity
+            self._column_pairs = tuple((sys.intern(col.casefold()), col) for col in all_columns)
+            self._cached_columns_lower = frozenset(lower for lower, _ in self._column_pairs)
+            self._columns_source = all_columns
+        return self._cached_columns_lower
     
     def validate_sql(self, sql: str, question: str) -> Tuple[bool, str]:
         """
@@ -46,13 +194,20 @@ class SQLValidator:
             tuple: (is_valid, error_message)
         """
         try:
-            if not self._is_basic_sql_valid(sql):
-                return False, "Invalid SQL structure"
+            fast_error = self._fast_reject(sql)
+            if fast_error:
+                return False, fast_error
             
+            # Error replies are caught on the raw string, before any copy is made
             if self._contains_error_message(sql):
                 return False, "AI returned error message instead of SQL"
             
-            validation_error = self._check_column_validity(sql)
+            # Case-fold and locate clause anchors once for the column checks; column
+            # names are folded the same way so comparisons stay consistent
+            sql_lower = sql.casefold()
+            anchors = self._scan_anchors(sql_lower)
+            
+            validation_error = self._check_column_validity(sql_lower, anchors)
             if validation_error:
                 return False, validation_error
             
@@ -62,50 +217,101 @@ class SQLValidator:
             logger.error(f"Error validating SQL: {e}")
             return True, None  # Allow if validation fails
     
-    def _is_basic_sql_valid(self, sql: str) -> bool:
-        """Check basic SQL structure."""
+    def validate_many(self, sqls: Iterable[str]) -> List[Tuple[bool, str]]:
+        """
+        Validate a batch of generated SQL queries (e.g. for offline evaluation).
+        
+        The schema column cache is resolved once up front; every query then runs
+        through the same precompiled matchers as validate_sql.
+        
+        Args:
+            sqls: Generated SQL queries
+            
+        Returns:
+            list: (is_valid, error_message) for each query, in input order
+        """
+        try:
+            self._columns_lower()
+        except Exception as e:
+            logger.error(f"Error loading schema columns for batch validation: {e}")
+        return [self.validate_sql(sql, "") for sql in sqls]
+    
+    def _fast_reject(self, sql: str) -> Optional[str]:
+        """
+        Reject obviously invalid SQL with precompiled regexes.
+        
+        The anchored statement-start match also covers the basic structure
+        check: the query must begin with SELECT or WITH (after comments and
+        opening parentheses).
+        
+        Returns:
+            str: Error message if rejected, None if the query should be fully validated
+        """
         if not sql or not isinstance(sql, str):
-            return False
+            return "Invalid SQL structure"
+        if any(match.lastgroup for match in _FAST_SQL_BAD.finditer(sql)):
+            return "Only read-only SELECT queries are allowed"
+        if not _FAST_SQL_OK.match(sql):
+            return "Invalid SQL structure"
+        return None
+    
+    @staticmethod
+    def _scan_anchors(sql_lower: str) -> Tuple[int, int, int]:
+        """
+        Find the first SELECT, FROM and ORDER BY positions in one pass.
         
-        sql_lower = sql.lower().strip()
-        return any(keyword in sql_lower for keyword in ['select', 'insert', 'update', 'delete'])
+        Args:
+            sql_lower: Lowercase SQL string
+            
+        Returns:
+            tuple: (select_pos, from_pos, order_by_pos), -1 where not found
+        """
+        positions = {}
+        for match in _SQL_ANCHORS.finditer(sql_lower):
+            if match.lastgroup is None:
+                continue  # Literal or comment
+            positions.setdefault(match.lastgroup, match.start())
+            if len(positions) == 3:
+                break
+        return positions.get('select', -1), positions.get('from', -1), positions.get('order_by', -1)
     
     def _contains_error_message(self, sql: str) -> bool:
         """Check if SQL contains error messages."""
-        sql_lower = sql.lower().strip()
-        error_indicators = [
-            "無法根據現有資料庫結構生成此查詢",
-            "sorry", "error", "unable", "cannot", "無法", "失敗"
-        ]
-        return any(indicator in sql_lower for indicator in error_indicators)
+        return _ERROR_INDICATORS.search(sql) is not None
     
-    def _check_column_validity(self, sql: str) -> str:
+    def _check_column_validity(self, sql_lower: str, anchors: Tuple[int, int, int]) -> str:
         """
         Check if SQL contains invalid column names.
         
+        Args:
+            sql_lower: Lowercase SQL string
+            anchors: (select_pos, from_pos, order_by_pos) from _scan_anchors
+            
         Returns:
             str: Error message if invalid columns found, None otherwise
         """
-        sql_lower = sql.lower()
-        
         # For complex CTE queries, use more lenient validation
-        if 'with ' in sql_lower and 'as (' in sql_lower:
+        if _CTE_START.match(sql_lower):
             return self._validate_cte_query(sql_lower)
         
+        # Most queries contain no suspicious pattern: skip the schema and alias work
+        found_patterns = self._scan_patterns(sql_lower, _CHECK_DEFAULT)
+        if not found_patterns:
+            return None
+        
         # Get all valid column names
-        all_columns = self.schema_manager.get_all_column_names()
-        all_columns_lower = {col.lower() for col in all_columns}
+        all_columns_lower = self._columns_lower()
         
         # Extract aliases from SELECT clause to avoid false positives
-        select_aliases = self._extract_select_aliases(sql)
+        select_aliases = self._extract_select_aliases(sql_lower, anchors)
         
         # Check for known invalid patterns, but exclude aliases
-        for pattern in self._invalid_patterns:
-            if pattern in sql_lower and pattern not in all_columns_lower:
+        for pattern in found_patterns:
+            if pattern not in all_columns_lower:
                 # Check if this is an alias in SELECT clause
                 if pattern not in select_aliases:
                     # Only flag if it appears in contexts other than SELECT alias or ORDER BY
-                    if self._is_invalid_column_usage(sql_lower, pattern, select_aliases):
+                    if self._is_invalid_column_usage(sql_lower, pattern, select_aliases, anchors):
                         return f"Column '{pattern}' does not exist in schema"
         
         return None
@@ -120,28 +326,16 @@ class SQLValidator:
         Returns:
             str: Error message if invalid, None otherwise
         """
-        # For CTE queries, only check for obvious invalid patterns
-        # that are not likely to be aliases or calculated fields
-        strict_invalid_patterns = {
-            'clicks',           # Definitely doesn't exist
-            'impressions',      # Definitely doesn't exist
-            'ctr',             # Definitely doesn't exist
-            'roas',            # Definitely doesn't exist
-            'created_by',      # User assumption
-            'user_id',         # User assumption
-            'tags',            # Classification assumption
-            'priority',        # Ordering assumption
-            'budget',          # Financial assumption
-            'participant_count' # Count assumption
-        }
+        # Only check for strict invalid patterns
+        found_patterns = self._scan_patterns(sql_lower, _CHECK_STRICT)
+        if not found_patterns:
+            return None
         
         # Get all valid column names
-        all_columns = self.schema_manager.get_all_column_names()
-        all_columns_lower = {col.lower() for col in all_columns}
+        all_columns_lower = self._columns_lower()
         
-        # Only check for strict invalid patterns
-        for pattern in strict_invalid_patterns:
-            if pattern in sql_lower and pattern not in all_columns_lower:
+        for pattern in found_patterns:
+            if pattern not in all_columns_lower:
                 # Check if it's used in a context that suggests it's a column reference
                 # rather than an alias
                 if self._is_likely_column_reference(sql_lower, pattern):
@@ -160,63 +354,30 @@ class SQLValidator:
         Returns:
             bool: True if likely a column reference
         """
-        import re
-        
-        # Look for patterns like "table.column" or "WHERE column ="
-        column_ref_patterns = [
-            rf'\w+\.{pattern}\b',  # table.column
-            rf'where\s+{pattern}\s*[=<>]',  # WHERE column =
-            rf'and\s+{pattern}\s*[=<>]',    # AND column =
-            rf'or\s+{pattern}\s*[=<>]',     # OR column =
-            rf'on\s+\w+\.{pattern}\s*=',    # ON table.column =
-        ]
-        
-        for regex_pattern in column_ref_patterns:
-            if re.search(regex_pattern, sql_lower):
-                return True
-        
-        return False
+        return self._col_ref_regexes[pattern].search(sql_lower) is not None
     
-    def _extract_select_aliases(self, sql: str) -> set:
+    def _extract_select_aliases(self, sql_lower: str, anchors: Tuple[int, int, int]) -> set:
         """
         Extract aliases from SELECT clause.
         
         Args:
-            sql: SQL query string
+            sql_lower: Lowercase SQL string
+            anchors: (select_pos, from_pos, order_by_pos) from _scan_anchors
             
         Returns:
             set: Set of aliases found in SELECT clause
         """
-        aliases = set()
-        sql_lower = sql.lower()
-        
-        try:
-            # Find SELECT clause
-            select_start = sql_lower.find('select')
-            from_start = sql_lower.find('from')
-            
-            if select_start != -1 and from_start != -1:
-                select_clause = sql_lower[select_start + 6:from_start].strip()
-                
-                # Split by comma and look for 'as' keyword
-                parts = select_clause.split(',')
-                for part in parts:
-                    part = part.strip()
-                    if ' as ' in part:
-                        alias = part.split(' as ')[-1].strip()
-                        aliases.add(alias)
-                    elif ' ' in part and not any(func in part for func in ['count', 'sum', 'avg', 'round', 'nullif']):
-                        # Simple alias without 'as' keyword
-                        words = part.split()
-                        if len(words) >= 2:
-                            aliases.add(words[-1])
+        select_start, from_start, _ = anchors
+        if select_start == -1 or from_start == -1:
+            return set()
         
-        except Exception as e:
-            logger.debug(f"Error extracting aliases: {e}")
-        
-        return aliases
+        # One regex pass over the SELECT list; identifiers followed by ')' (e.g.
+        # function arguments) or standing alone (bare columns) are not aliases
+        aliases = {sys.intern(alias) for alias in _SELECT_ALIAS.findall(sql_lower, select_start + 6, from_start)}
+        return aliases - _NON_ALIAS_WORDS
     
-    def _is_invalid_column_usage(self, sql_lower: str, pattern: str, select_aliases: set) -> bool:
+    def _is_invalid_column_usage(self, sql_lower: str, pattern: str, select_aliases: set,
+                                 anchors: Tuple[int, int, int]) -> bool:
         """
         Check if pattern usage is invalid (not as an alias or in ORDER BY).
         
@@ -224,6 +385,7 @@ class SQLValidator:
             sql_lower: Lowercase SQL string
             pattern: Pattern to check
             select_aliases: Set of SELECT aliases
+            anchors: (select_pos, from_pos, order_by_pos) from _scan_anchors
             
         Returns:
             bool: True if usage is invalid
@@ -233,29 +395,16 @@ class SQLValidator:
             return False
         
         # Check if it only appears in ORDER BY (which is valid for aliases)
-        import re
-        
-        # Find all occurrences of the pattern
-        pattern_positions = []
-        start = 0
-        while True:
-            pos = sql_lower.find(pattern, start)
-            if pos == -1:
-                break
-            pattern_positions.append(pos)
-            start = pos + 1
+        select_pos, from_pos, order_by_pos = anchors
         
-        # Check if all occurrences are in valid contexts
-        order_by_pos = sql_lower.find('order by')
-        
-        for pos in pattern_positions:
+        # Check if all whole-word occurrences are in valid contexts
+        for match in self._pattern_word_regexes[pattern].finditer(sql_lower):
+            pos = match.start()
             # Check if this occurrence is in ORDER BY clause
             if order_by_pos != -1 and pos > order_by_pos:
                 continue  # Valid usage in ORDER BY
             
             # Check if this occurrence is in SELECT clause as alias
-            select_pos = sql_lower.find('select')
-            from_pos = sql_lower.find('from')
             if select_pos != -1 and from_pos != -1 and select_pos < pos < from_pos:
                 continue  # Valid usage in SELECT as alias
             
@@ -274,13 +423,24 @@ class SQLValidator:
         Returns:
             list: List of suggested valid column names
         """
-        all_columns = self.schema_manager.get_all_column_names()
+        self._columns_lower()  # Refresh the cached column names if the schema changed
         suggestions = []
         
-        # Simple similarity matching
-        invalid_lower = invalid_column.lower()
-        for col in all_columns:
-            if invalid_lower in col.lower() or col.lower() in invalid_lower:
+        # Simple similarity matching against the pre-lowercased column names
+        invalid_lower = invalid_column.casefold()
+        for col_lower, col in self._column_pairs:
+            if invalid_lower in col_lower or col_lower in invalid_lower:
                 suggestions.append(col)
+                if len(suggestions) == 3:  # Return top 3 suggestions
+                    break
+        
+        if len(suggestions) < 3:
+            # Fill up with the closest names by edit similarity (catches typos
+            # and near-miss names that substring matching does not)
+            originals = dict(self._column_pairs)
+            for col_lower in difflib.get_close_matches(invalid_lower, list(originals), n=3, cutoff=0.6):
+                col = originals[col_lower]
+                if col not in suggestions:
+                    suggestions.append(col)
         
-        return suggestions[:3]  # Return top 3 suggestions 
\ No newline at end of file
+        return suggestions[:3] 
\ No newline at end of file